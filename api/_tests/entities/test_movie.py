@@ -0,0 +1,61 @@
+import pytest
+
+from api.entities.movie import Movie
+
+
+def test_replace():
+    movie = Movie(
+        movie_id="my-id",
+        title="My Movie",
+        description="My description",
+        release_year=1990,
+    )
+    updated_movie = movie.replace(title="My Updated Movie", watched=True)
+    assert updated_movie == Movie(
+        movie_id="my-id",
+        title="My Updated Movie",
+        description="My description",
+        release_year=1990,
+        watched=True,
+    )
+    # The original movie is left untouched.
+    assert movie.title == "My Movie"
+    assert movie.watched is False
+
+
+@pytest.mark.parametrize("changes", [{"id": "other-id"}, {"rating": 5}])
+def test_replace_unknown_field(changes):
+    movie = Movie(
+        movie_id="my-id",
+        title="My Movie",
+        description="My description",
+        release_year=1990,
+    )
+    with pytest.raises(TypeError):
+        movie.replace(**changes)
+
+
+def test_no_instance_dict():
+    movie = Movie(
+        movie_id="my-id",
+        title="My Movie",
+        description="My description",
+        release_year=1990,
+    )
+    with pytest.raises(AttributeError):
+        movie.rating = 5
+
+
+def test_version():
+    movie = Movie(
+        movie_id="my-id",
+        title="My Movie",
+        description="My description",
+        release_year=1990,
+    )
+    assert movie.version == 0
+    versioned_movie = movie.with_version(3)
+    assert versioned_movie.version == 3
+    assert versioned_movie.replace(watched=True).version == 3
+    # The version isn't part of the movie content.
+    assert versioned_movie == movie
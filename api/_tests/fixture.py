@@ -6,11 +6,77 @@ import pytest
 from starlette.testclient import TestClient
 
 from api.api import create_app
+from api.entities.movie import Movie
 from api.repository.movie.memory import MemoryMovieRepository
 from api.repository.movie.mongo import MongoMovieRepository
 from api.settings import Settings, settings_instance
 
 
+class CountingMovieRepository(MemoryMovieRepository):
+    """
+    CountingMovieRepository records the get_by_id, get_many and create_many calls reaching
+    the backend. It fails the get_many and create_many calls if fail is set, and the created
+    movies of the ids in failing.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.get_by_id_calls = 0
+        self.get_many_calls = []
+        self.create_many_calls = []
+        self.failing = set()
+        self.fail = False
+
+    async def get_by_id(self, movie_id, fields=None):
+        self.get_by_id_calls += 1
+        # Yield to the event loop like a real database call would.
+        await asyncio.sleep(0)
+        return await super().get_by_id(movie_id, fields=fields)
+
+    async def get_many(self, movie_ids):
+        self.get_many_calls.append(list(movie_ids))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("backend failure")
+        return await super().get_many(movie_ids)
+
+    async def create_many(self, movies):
+        self.create_many_calls.append([movie.id for movie in movies])
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("backend failure")
+        errors = iter(
+            await super().create_many(
+                [movie for movie in movies if movie.id not in self.failing]
+            )
+        )
+        return [
+            "duplicate key" if movie.id in self.failing else next(errors)
+            for movie in movies
+        ]
+
+
+class FakeClock:
+    """
+    FakeClock returns now, set by the tests to move the time.
+    """
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_movie(movie_id: str, title: str = "My Movie") -> Movie:
+    return Movie(
+        movie_id=movie_id,
+        title=title,
+        description="My description",
+        release_year=1990,
+    )
+
+
 @pytest.fixture()
 def test_client():
     settings: Settings = settings_instance()
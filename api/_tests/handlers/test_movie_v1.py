@@ -1,12 +1,18 @@
 import functools
+import json
 
 import pytest
 
 # noinspection PyUnresolvedReferences
 from api._tests.fixture import test_client
 from api.entities.movie import Movie
-from api.handlers.movie_v1 import movie_repository
+from api.handlers.movie_v1 import movie_repository, title_result_cache
 from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.title_results import (
+    TitleResultCache,
+    TitleResultInvalidatingMovieRepository,
+)
+from api.responses import movie_etag, movie_to_dict
 
 
 def memory_repository_dependency(dependency):
@@ -378,9 +384,9 @@ async def test_patch_update_movie(test_client, update_parameters, updated_movie)
 
     # Assertion
     assert result.status_code == 200
-    assert result.json() == {"message": "Movie updated."}
-    if updated_movie is not None:
-        assert await repo.get_by_id(movie_id="top_movie") == updated_movie
+    assert result.json() == movie_to_dict(updated_movie)
+    assert result.headers["ETag"] == movie_etag(updated_movie.with_version(2))
+    assert await repo.get_by_id(movie_id="top_movie") == updated_movie
 
 
 @pytest.mark.asyncio()
@@ -422,3 +428,534 @@ async def test_delete_movie(test_client):
     # Assertion
     assert result.status_code == 204
     assert await repo.get_by_id(movie_id="top_movie") is None
+
+
+@pytest.mark.asyncio()
+async def test_create_movies_bulk(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    # Test
+    result = test_client.post(
+        "/api/v1/movies/bulk",
+        json=[
+            {
+                "title": "My Movie",
+                "description": "string",
+                "release_year": 2000,
+            },
+            {
+                "title": "My Movie",
+                "description": "string",
+                "release_year": 0,
+            },
+            {
+                "title": "My Second Movie",
+                "description": "string",
+                "release_year": 2001,
+                "watched": True,
+            },
+        ],
+    )
+
+    # Assertion
+    assert result.status_code == 201
+    items = result.json()["items"]
+    assert len(items) == 3
+    assert items[0]["error"] is None
+    assert items[1] == {
+        "id": None,
+        "error": "release_year: release_year's must be greater than 1900.",
+    }
+    assert items[2]["error"] is None
+    first_movie = await repo.get_by_id(movie_id=items[0]["id"])
+    second_movie = await repo.get_by_id(movie_id=items[2]["id"])
+    assert first_movie.title == "My Movie"
+    assert second_movie.title == "My Second Movie"
+    assert second_movie.watched is True
+
+
+@pytest.mark.asyncio()
+async def test_create_movies_bulk_not_objects(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    # Test
+    result = test_client.post(
+        "/api/v1/movies/bulk",
+        json=[
+            "My Movie",
+            {
+                "title": "My Movie",
+                "description": "string",
+                "release_year": 2000,
+            },
+            None,
+            [1, 2],
+        ],
+    )
+
+    # Assertion
+    assert result.status_code == 201
+    items = result.json()["items"]
+    assert [item["error"] for item in items] == [
+        "movie: not an object",
+        None,
+        "movie: not an object",
+        "movie: not an object",
+    ]
+    assert (await repo.get_by_id(movie_id=items[1]["id"])).title == "My Movie"
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_ids(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("1", "2"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="Movie Description",
+                release_year=2000,
+            )
+        )
+
+    # Test
+    result = test_client.get("/api/v1/movies/batch?ids=2&ids=random&ids=1")
+
+    # Assertion
+    assert result.status_code == 200
+    assert [movie["id"] for movie in result.json()["movies"]] == ["2", "1"]
+    assert result.json()["not_found"] == ["random"]
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_cursor(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("1", "2", "3"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+            )
+        )
+
+    # Test
+    pages = []
+    url = "/api/v1/movies/?title=movie title&limit=2"
+    result = test_client.get(url)
+    pages.append([movie["id"] for movie in result.json()])
+    cursor = result.headers["X-Next-Cursor"]
+    result = test_client.get(f"{url}&after={cursor}")
+    pages.append([movie["id"] for movie in result.json()])
+
+    # Assertion
+    assert result.status_code == 200
+    assert pages == [["1", "2"], ["3"]]
+    assert "X-Next-Cursor" not in result.headers
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_prefix(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id, title in (
+        ("1", "Movie Title 2"),
+        ("2", "movie title"),
+        ("3", "Movie Title"),
+        ("4", "Other Movie"),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="Movie Description",
+                release_year=2000,
+            )
+        )
+
+    # Test
+    pages = []
+    url = "/api/v1/movies/?title=MOVIE&match=prefix&limit=2&fields=release_year"
+    result = test_client.get(url)
+    pages.append(result.json())
+    cursor = result.headers["X-Next-Cursor"]
+    result = test_client.get(f"{url}&after={cursor}")
+    pages.append(result.json())
+
+    # Assertion
+    assert result.status_code == 200
+    assert pages == [
+        [{"id": "2", "release_year": 2000}, {"id": "3", "release_year": 2000}],
+        [{"id": "1", "release_year": 2000}],
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_invalid_match(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+
+    # Test
+    result = test_client.get("/api/v1/movies/?title=movie title&match=regex")
+
+    # Assertion
+    assert result.status_code == 422
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_invalid_cursor(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+
+    # Test
+    result = test_client.get("/api/v1/movies/?title=movie title&after=invalid")
+
+    # Assertion
+    assert result.status_code == 400
+    assert result.json() == {"detail": "invalid cursor"}
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_ndjson(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("1", "2", "3"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+            )
+        )
+
+    # Test
+    result = test_client.get(
+        "/api/v1/movies/?title=movie title&skip=1",
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    # Assertion
+    assert result.status_code == 200
+    assert result.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in result.text.splitlines()] == [
+        {
+            "description": "Movie Description",
+            "id": movie_id,
+            "release_year": 2000,
+            "title": "movie title",
+            "watched": False,
+        }
+        for movie_id in ("2", "3")
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_fields(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("1", "2"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+            )
+        )
+
+    # Test
+    by_id = test_client.get("/api/v1/movies/1?fields=title,watched")
+    by_title = test_client.get(
+        "/api/v1/movies/?title=movie title&limit=1&fields=id,release_year"
+    )
+    unknown = test_client.get("/api/v1/movies/1?fields=title,rating")
+
+    # Assertion
+    assert by_id.status_code == 200
+    assert by_id.json() == {"id": "1", "title": "movie title", "watched": False}
+    assert by_title.status_code == 200
+    assert by_title.json() == [{"id": "1", "release_year": 2000}]
+    assert "X-Next-Cursor" in by_title.headers
+    assert unknown.status_code == 400
+    assert unknown.json() == {"detail": "unknown fields: rating"}
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_fuzzy_title(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id, title in (
+        ("1", "The Matrix"),
+        ("2", "The Matrix Reloaded"),
+        ("3", "Casablanca"),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="Movie Description",
+                release_year=2000,
+            )
+        )
+
+    # Test
+    result = test_client.get("/api/v1/movies/fuzzy?title=teh matrix&limit=1")
+
+    # Assertion
+    assert result.status_code == 200
+    assert [movie["id"] for movie in result.json()] == ["1"]
+    assert 0 < result.json()[0]["score"] < 1
+
+
+@pytest.mark.asyncio()
+async def test_search_movies(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id, description in (
+        ("1", "A hacker learns the truth."),
+        ("2", "Two friends cross the desert."),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="Movie Title",
+                description=description,
+                release_year=2000,
+            )
+        )
+
+    # Test
+    result = test_client.get("/api/v1/movies/search?q=hacker")
+
+    # Assertion
+    assert result.status_code == 200
+    assert [movie["id"] for movie in result.json()] == ["1"]
+    assert result.json()[0]["score"] > 0
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_by_id_etag(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="1",
+            title="movie title",
+            description="Movie Description",
+            release_year=2000,
+        )
+    )
+
+    # Test
+    first = test_client.get("/api/v1/movies/1")
+    etag = first.headers["ETag"]
+    not_modified = test_client.get("/api/v1/movies/1", headers={"If-None-Match": etag})
+    await repo.update("1", {"watched": True})
+    modified = test_client.get("/api/v1/movies/1", headers={"If-None-Match": etag})
+
+    # Assertion
+    assert first.status_code == 200
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    assert modified.status_code == 200
+    assert modified.json()["watched"] is True
+    assert modified.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_by_id_etag_recreated(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="1",
+            title="movie title",
+            description="Movie Description",
+            release_year=2000,
+        )
+    )
+
+    # Test
+    etag = test_client.get("/api/v1/movies/1").headers["ETag"]
+    await repo.delete("1")
+    await repo.create(
+        Movie(
+            movie_id="1",
+            title="other title",
+            description="Other Description",
+            release_year=2010,
+        )
+    )
+    result = test_client.get("/api/v1/movies/1", headers={"If-None-Match": etag})
+
+    # Assertion
+    assert result.status_code == 200
+    assert result.json()["title"] == "other title"
+    assert result.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_etag(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("1", "2"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+            )
+        )
+
+    # Test
+    url = "/api/v1/movies/?title=movie title"
+    first = test_client.get(url)
+    etag = first.headers["ETag"]
+    not_modified = test_client.get(url, headers={"If-None-Match": f'"x", {etag}'})
+    partial = test_client.get(f"{url}&fields=title", headers={"If-None-Match": etag})
+    await repo.update("2", {"watched": True})
+    modified = test_client.get(url, headers={"If-None-Match": etag})
+
+    # Assertion
+    assert etag.startswith('W/"')
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert partial.status_code == 200
+    assert modified.status_code == 200
+    assert modified.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio()
+async def test_get_movies_by_title_cached(test_client):
+    # Setup
+    backend = MemoryMovieRepository()
+    cache = TitleResultCache()
+    repo = TitleResultInvalidatingMovieRepository(backend, cache)
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    test_client.app.dependency_overrides[title_result_cache] = functools.partial(
+        memory_repository_dependency, cache
+    )
+    await repo.create(
+        Movie(
+            movie_id="1",
+            title="movie title",
+            description="Movie Description",
+            release_year=2000,
+        )
+    )
+
+    # Test
+    url = "/api/v1/movies/?title=movie title"
+    first = test_client.get(url)
+    # Written around the cache, the cached response is still served.
+    await backend.delete("1")
+    cached = test_client.get(url)
+    not_modified = test_client.get(
+        url, headers={"If-None-Match": first.headers["ETag"]}
+    )
+    await repo.create(
+        Movie(
+            movie_id="2",
+            title="Movie Title",
+            description="Movie Description",
+            release_year=2000,
+        )
+    )
+    invalidated = test_client.get(url)
+    test_client.app.dependency_overrides.pop(title_result_cache)
+
+    # Assertion
+    assert [movie["id"] for movie in first.json()] == ["1"]
+    assert cached.content == first.content
+    assert cached.headers["ETag"] == first.headers["ETag"]
+    assert not_modified.status_code == 304
+    assert invalidated.json() == []
+
+
+@pytest.mark.asyncio()
+async def test_export_movies(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("3", "1", "2"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="movie title",
+                description="Movie Description",
+                release_year=2000,
+            )
+        )
+
+    # Test
+    result = test_client.get(
+        "/api/v1/movies/export", headers={"Accept-Encoding": "identity"}
+    )
+    compressed = test_client.get(
+        "/api/v1/movies/export?after=1&fields=title",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    # Assertion
+    assert result.status_code == 200
+    assert result.headers["content-type"] == "application/x-ndjson"
+    assert "Content-Encoding" not in result.headers
+    lines = [json.loads(line) for line in result.text.splitlines()]
+    assert [movie["id"] for movie in lines] == ["1", "2", "3"]
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert [json.loads(line) for line in compressed.text.splitlines()] == [
+        {"id": "2", "title": "movie title"},
+        {"id": "3", "title": "movie title"},
+    ]
@@ -0,0 +1,44 @@
+import inspect
+
+import pytest
+
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import (
+    DelegatingMovieRepository,
+    MovieRepository,
+)
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+def test_delegating_overrides_every_method():
+    methods = [
+        name
+        for name, _ in inspect.getmembers(MovieRepository, inspect.isfunction)
+        if not name.startswith("_")
+    ]
+    for name in methods:
+        assert getattr(DelegatingMovieRepository, name) is not getattr(
+            MovieRepository, name
+        ), name
+
+
+@pytest.mark.asyncio
+async def test_delegating_forwards_calls():
+    backend = MemoryMovieRepository()
+    repo = DelegatingMovieRepository(backend)
+    movie = Movie(
+        movie_id="my-id",
+        title="My Movie",
+        description="My description",
+        release_year=1990,
+    )
+
+    await repo.create(movie)
+    updated = await repo.update("my-id", {"watched": True})
+
+    assert updated.watched is True
+    assert await backend.get_by_id("my-id") == updated
+    assert [movie.id async for movie in repo.iter_all()] == ["my-id"]
+    assert [m.id for m in await repo.get_by_title("My Movie")] == ["my-id"]
+    assert await repo.delete("my-id") == updated
+    assert await backend.get_by_id("my-id") is None
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from api._tests.fixture import CountingMovieRepository, make_movie
+from api.repository.movie.batching import BatchingMovieRepository
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_a_batch():
+    backend = CountingMovieRepository()
+    repo = BatchingMovieRepository(backend)
+    await repo.create_many([make_movie("1"), make_movie("2")])
+    movies = await asyncio.gather(
+        repo.get_by_id("1"),
+        repo.get_by_id("missing"),
+        repo.get_by_id("2"),
+        repo.get_by_id("1"),
+    )
+    assert movies == [make_movie("1"), None, make_movie("2"), make_movie("1")]
+    assert backend.get_many_calls == [["1", "missing", "2"]]
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size():
+    backend = CountingMovieRepository()
+    repo = BatchingMovieRepository(backend, max_batch_size=2)
+    await asyncio.gather(*[repo.get_by_id(str(i)) for i in range(5)])
+    assert backend.get_many_calls == [["0", "1"], ["2", "3"], ["4"]]
+
+
+@pytest.mark.asyncio
+async def test_window():
+    backend = CountingMovieRepository()
+    repo = BatchingMovieRepository(backend, window=0.05)
+
+    async def later(movie_id: str):
+        await asyncio.sleep(0.01)
+        return await repo.get_by_id(movie_id)
+
+    await asyncio.gather(repo.get_by_id("1"), later("2"))
+    assert backend.get_many_calls == [["1", "2"]]
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_caller():
+    backend = CountingMovieRepository()
+    backend.fail = True
+    repo = BatchingMovieRepository(backend)
+    results = await asyncio.gather(
+        repo.get_by_id("1"), repo.get_by_id("2"), return_exceptions=True
+    )
+    assert [str(result) for result in results] == ["backend failure"] * 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_others():
+    backend = CountingMovieRepository()
+    repo = BatchingMovieRepository(backend)
+    await repo.create(make_movie("1"))
+    cancelled = asyncio.ensure_future(repo.get_by_id("1"))
+    other = asyncio.ensure_future(repo.get_by_id("1"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    assert await other == make_movie("1")
+
+
+@pytest.mark.asyncio
+async def test_fields_are_not_batched():
+    backend = CountingMovieRepository()
+    repo = BatchingMovieRepository(backend)
+    await repo.create(make_movie("1"))
+    assert await repo.get_by_id("1", fields=("title",)) == make_movie("1")
+    assert backend.get_many_calls == []
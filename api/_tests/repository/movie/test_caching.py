@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from api._tests.fixture import CountingMovieRepository, FakeClock, make_movie
+from api.entities.movie import Movie
+from api.repository.movie.caching import CachingMovieRepository
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_hit():
+    backend = CountingMovieRepository()
+    repo = CachingMovieRepository(backend)
+    await repo.create(make_movie("my-id"))
+    assert await repo.get_by_id("my-id") == make_movie("my-id")
+    assert await repo.get_by_id("my-id") == make_movie("my-id")
+    assert backend.get_by_id_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_not_found_is_not_cached():
+    backend = CountingMovieRepository()
+    repo = CachingMovieRepository(backend)
+    assert await repo.get_by_id("my-id") is None
+    await backend.create(make_movie("my-id"))
+    assert await repo.get_by_id("my-id") == make_movie("my-id")
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_ttl():
+    backend = CountingMovieRepository()
+    clock = FakeClock()
+    repo = CachingMovieRepository(backend, ttl=10, clock=clock)
+    await repo.create(make_movie("my-id"))
+    await repo.get_by_id("my-id")
+    clock.now = 9
+    await repo.get_by_id("my-id")
+    assert backend.get_by_id_calls == 1
+    clock.now = 10
+    await repo.get_by_id("my-id")
+    assert backend.get_by_id_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_lru_eviction():
+    backend = CountingMovieRepository()
+    repo = CachingMovieRepository(backend, max_size=2)
+    for movie_id in ("1", "2", "3"):
+        await repo.create(make_movie(movie_id))
+    await repo.get_by_id("1")
+    await repo.get_by_id("2")
+    # "1" becomes the most recently used so "2" is evicted by "3".
+    await repo.get_by_id("1")
+    await repo.get_by_id("3")
+    assert backend.get_by_id_calls == 3
+    await repo.get_by_id("1")
+    assert backend.get_by_id_calls == 3
+    await repo.get_by_id("2")
+    assert backend.get_by_id_calls == 4
+
+
+@pytest.mark.asyncio
+async def test_get_by_id_concurrent_misses_share_backend_call():
+    backend = CountingMovieRepository()
+    repo = CachingMovieRepository(backend)
+    await repo.create(make_movie("my-id"))
+    movies = await asyncio.gather(*[repo.get_by_id("my-id") for _ in range(10)])
+    assert movies == [make_movie("my-id")] * 10
+    assert backend.get_by_id_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate():
+    backend = CountingMovieRepository()
+    repo = CachingMovieRepository(backend)
+    await repo.create(make_movie("my-id"))
+    await repo.get_by_id("my-id")
+    await repo.update("my-id", {"title": "My Updated Movie"})
+    assert await repo.get_by_id("my-id") == make_movie(
+        "my-id", title="My Updated Movie"
+    )
+    await repo.create(make_movie("my-id", title="My Created Movie"))
+    assert await repo.get_by_id("my-id") == make_movie(
+        "my-id", title="My Created Movie"
+    )
+    await repo.delete("my-id")
+    assert await repo.get_by_id("my-id") is None
+    # The movie returned by update is cached, the read after it is a hit.
+    assert backend.get_by_id_calls == 3
+
+
+@pytest.mark.asyncio
+async def test_get_many():
+    backend = CountingMovieRepository()
+    repo = CachingMovieRepository(backend)
+    await repo.create_many([make_movie("1"), make_movie("2")])
+    await repo.get_by_id("1")
+    assert await repo.get_many(["2", "missing", "1"]) == [
+        make_movie("2"),
+        None,
+        make_movie("1"),
+    ]
+    assert await repo.get_by_id("2") == make_movie("2")
+    assert backend.get_by_id_calls == 1
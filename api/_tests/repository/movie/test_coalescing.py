@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from api._tests.fixture import CountingMovieRepository, make_movie
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.coalescing import CoalescingMovieRepository
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creates_share_a_batch():
+    backend = CountingMovieRepository()
+    repo = CoalescingMovieRepository(backend, window=0)
+    await asyncio.gather(repo.create(make_movie("1")), repo.create(make_movie("2")))
+    assert backend.create_many_calls == [["1", "2"]]
+    assert await repo.get_many(["1", "2"]) == [make_movie("1"), make_movie("2")]
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size():
+    backend = CountingMovieRepository()
+    repo = CoalescingMovieRepository(backend, max_batch_size=2)
+    await asyncio.gather(*[repo.create(make_movie(str(i))) for i in range(5)])
+    assert backend.create_many_calls == [["0", "1"], ["2", "3"], ["4"]]
+
+
+@pytest.mark.asyncio
+async def test_same_movie_goes_to_the_next_batch():
+    backend = CountingMovieRepository()
+    repo = CoalescingMovieRepository(backend)
+    await asyncio.gather(
+        repo.create(make_movie("1")),
+        repo.create(make_movie("1", title="My Other Movie")),
+    )
+    assert backend.create_many_calls == [["1"], ["1"]]
+    assert (await repo.get_by_id("1")).title == "My Other Movie"
+
+
+@pytest.mark.asyncio
+async def test_every_caller_gets_its_own_outcome():
+    backend = CountingMovieRepository()
+    backend.failing.add("2")
+    repo = CoalescingMovieRepository(backend)
+    results = await asyncio.gather(
+        repo.create(make_movie("1")),
+        repo.create(make_movie("2")),
+        return_exceptions=True,
+    )
+    assert results[0] is None
+    assert isinstance(results[1], RepositoryException)
+    assert backend.create_many_calls == [["1", "2"]]
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_caller():
+    backend = CountingMovieRepository()
+    backend.fail = True
+    repo = CoalescingMovieRepository(backend)
+    results = await asyncio.gather(
+        repo.create(make_movie("1")),
+        repo.create(make_movie("2")),
+        return_exceptions=True,
+    )
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
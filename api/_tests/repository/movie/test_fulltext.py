@@ -0,0 +1,42 @@
+import math
+
+from api.repository.movie.fulltext import FullTextIndex, tokenize
+
+
+def test_tokenize():
+    assert tokenize("The Hacker, and the BANK!") == ["hacker", "bank"]
+
+
+def test_search_scores_bm25():
+    index = FullTextIndex(k1=1.2, b=0.75)
+    index.add("a", "space travel")
+    index.add("b", "space space opera")
+    index.add("c", "western")
+    results = index.search("space")
+    assert [movie_id for movie_id, _ in results] == ["b", "a"]
+
+    # Computed by hand: 3 movies of 2, 3 and 1 words, space is in 2 of them.
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    average_length = 2
+
+    def score(frequency: int, length: int) -> float:
+        norm = 1.2 * (1 - 0.75 + 0.75 * length / average_length)
+        return idf * frequency * 2.2 / (frequency + norm)
+
+    assert math.isclose(results[0][1], score(2, 3))
+    assert math.isclose(results[1][1], score(1, 2))
+
+
+def test_remove_and_compaction():
+    index = FullTextIndex()
+    for i in range(3000):
+        index.add(str(i), f"movie number{i}")
+    for i in range(2500):
+        index.remove(str(i))
+    index.add("2999", "another text")
+    assert len(index) == 500
+    # noinspection PyProtectedMember
+    assert len(index._ids) < 3000
+    assert index.search("number10") == []
+    assert [movie_id for movie_id, _ in index.search("number2998")] == ["2998"]
+    assert [movie_id for movie_id, _ in index.search("another")] == ["2999"]
@@ -0,0 +1,70 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from api._tests.fixture import make_movie
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.instrumented import InstrumentedMovieRepository
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+def _sample(name: str, operation: str) -> float:
+    value = REGISTRY.get_sample_value(name, {"backend": "test", "operation": operation})
+    return value or 0.0
+
+
+@pytest.mark.asyncio
+async def test_records_latency_and_results():
+    repo = InstrumentedMovieRepository(MemoryMovieRepository(), backend="test")
+    calls = _sample("movie_repository_call_seconds_count", "get_many")
+    results = _sample("movie_repository_results_sum", "get_many")
+
+    await repo.create_many([make_movie("first"), make_movie("second")])
+    movies = await repo.get_many(["first", "missing", "second"])
+
+    assert [movie.id if movie else None for movie in movies] == [
+        "first",
+        None,
+        "second",
+    ]
+    assert _sample("movie_repository_call_seconds_count", "get_many") == calls + 1
+    assert _sample("movie_repository_results_sum", "get_many") == results + 2
+
+
+@pytest.mark.asyncio
+async def test_records_iterated_results():
+    repo = InstrumentedMovieRepository(MemoryMovieRepository(), backend="test")
+    await repo.create_many([make_movie("first"), make_movie("second")])
+    calls = _sample("movie_repository_call_seconds_count", "iter_by_title")
+    results = _sample("movie_repository_results_sum", "iter_by_title")
+
+    movies = [movie async for movie in repo.iter_by_title("My Movie")]
+
+    assert len(movies) == 2
+    assert _sample("movie_repository_call_seconds_count", "iter_by_title") == calls + 1
+    assert _sample("movie_repository_results_sum", "iter_by_title") == results + 2
+
+
+@pytest.mark.asyncio
+async def test_records_errors():
+    repo = InstrumentedMovieRepository(MemoryMovieRepository(), backend="test")
+    errors = _sample("movie_repository_errors_total", "update")
+    calls = _sample("movie_repository_call_seconds_count", "update")
+
+    with pytest.raises(RepositoryException):
+        await repo.update("missing", {"title": "My Movie"})
+
+    assert _sample("movie_repository_errors_total", "update") == errors + 1
+    assert _sample("movie_repository_call_seconds_count", "update") == calls + 1
+
+
+@pytest.mark.asyncio
+async def test_records_fuzzy_title_results():
+    repo = InstrumentedMovieRepository(MemoryMovieRepository(), backend="test")
+    await repo.create_many([make_movie("first"), make_movie("second")])
+    results = _sample("movie_repository_results_sum", "get_by_fuzzy_title")
+
+    movies = await repo.get_by_fuzzy_title("My Movi")
+
+    assert len(movies) == 2
+    assert _sample("movie_repository_results_sum", "get_by_fuzzy_title") == results + 2
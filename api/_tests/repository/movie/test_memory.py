@@ -16,7 +16,7 @@ async def test_create(memory_movie_repo_fixture):
         release_year=1990,
     )
     await memory_movie_repo_fixture.create(movie)
-    assert await memory_movie_repo_fixture.get_by_id("test") is movie
+    assert await memory_movie_repo_fixture.get_by_id("test") == movie
 
 
 @pytest.mark.parametrize(
@@ -256,5 +256,367 @@ async def test_delete(memory_movie_repo_fixture):
             release_year=1990,
         )
     )
-    await memory_movie_repo_fixture.delete("my-id-2")
+    deleted = await memory_movie_repo_fixture.delete("my-id-2")
+    assert deleted.title == "My Movie"
     assert await memory_movie_repo_fixture.get_by_id("my-id-2") is None
+    assert await memory_movie_repo_fixture.delete("my-id-2") is None
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_after_title_update(memory_movie_repo_fixture):
+    await memory_movie_repo_fixture.create(
+        Movie(
+            movie_id="my-id",
+            title="My Movie",
+            description="My description",
+            release_year=1990,
+        )
+    )
+    await memory_movie_repo_fixture.update(
+        movie_id="my-id", update_parameters={"title": "My Renamed Movie"}
+    )
+    assert await memory_movie_repo_fixture.get_by_title(title="My Movie") == []
+    assert await memory_movie_repo_fixture.get_by_title(title="My Renamed Movie") == [
+        Movie(
+            movie_id="my-id",
+            title="My Renamed Movie",
+            description="My description",
+            release_year=1990,
+        )
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_after_overwrite_and_delete(memory_movie_repo_fixture):
+    await memory_movie_repo_fixture.create(
+        Movie(
+            movie_id="my-id",
+            title="My Movie",
+            description="My description",
+            release_year=1990,
+        )
+    )
+    await memory_movie_repo_fixture.create(
+        Movie(
+            movie_id="my-id",
+            title="My Other Movie",
+            description="My description",
+            release_year=1990,
+        )
+    )
+    assert await memory_movie_repo_fixture.get_by_title(title="My Movie") == []
+    await memory_movie_repo_fixture.delete("my-id")
+    assert await memory_movie_repo_fixture.get_by_title(title="My Other Movie") == []
+
+
+@pytest.mark.asyncio
+async def test_create_many(memory_movie_repo_fixture):
+    movies = [
+        Movie(
+            movie_id="my-id",
+            title="My Movie",
+            description="My description",
+            release_year=1990,
+        ),
+        Movie(
+            movie_id="my-id-2",
+            title="My Movie",
+            description="My description",
+            release_year=1991,
+        ),
+    ]
+    errors = await memory_movie_repo_fixture.create_many(movies)
+    assert errors == [None, None]
+    assert await memory_movie_repo_fixture.get_by_title(title="My Movie") == movies
+
+
+@pytest.mark.asyncio
+async def test_get_many(memory_movie_repo_fixture):
+    movie = Movie(
+        movie_id="my-id",
+        title="My Movie",
+        description="My description",
+        release_year=1990,
+    )
+    await memory_movie_repo_fixture.create(movie)
+    movies = await memory_movie_repo_fixture.get_many(["missing", "my-id"])
+    assert movies == [None, movie]
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_after(memory_movie_repo_fixture):
+    movie_seed = [
+        Movie(
+            movie_id=movie_id,
+            title="My Movie",
+            description="My description",
+            release_year=1990,
+        )
+        for movie_id in ("my-id-3", "my-id", "my-id-2")
+    ]
+    for movie in movie_seed:
+        await memory_movie_repo_fixture.create(movie)
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="My Movie", limit=1, after="my-id"
+    )
+    assert [movie.id for movie in results] == ["my-id-2"]
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="My Movie", after="my-id-2"
+    )
+    assert [movie.id for movie in results] == ["my-id-3"]
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="My Movie", after="my-id-3"
+    )
+    assert results == []
+
+
+@pytest.mark.asyncio
+async def test_iter_by_title(memory_movie_repo_fixture):
+    movie_seed = [
+        Movie(
+            movie_id=movie_id,
+            title="My Movie",
+            description="My description",
+            release_year=1990,
+        )
+        for movie_id in ("my-id", "my-id-2", "my-id-3")
+    ]
+    for movie in movie_seed:
+        await memory_movie_repo_fixture.create(movie)
+    results = [
+        movie
+        async for movie in memory_movie_repo_fixture.iter_by_title(
+            title="My Movie", skip=1, limit=1
+        )
+    ]
+    assert results == movie_seed[1:2]
+
+
+@pytest.mark.asyncio
+async def test_iter_by_title_delete_while_iterating(memory_movie_repo_fixture):
+    for movie_id in ("my-id", "my-id-2", "my-id-3"):
+        await memory_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="My description",
+                release_year=1990,
+            )
+        )
+    results = []
+    async for movie in memory_movie_repo_fixture.iter_by_title(title="My Movie"):
+        results.append(movie.id)
+        if movie.id == "my-id":
+            await memory_movie_repo_fixture.delete("my-id-2")
+    assert results == ["my-id", "my-id-3"]
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_insensitive(memory_movie_repo_fixture):
+    movie_seed = [
+        Movie(
+            movie_id=movie_id,
+            title=title,
+            description="My description",
+            release_year=1990,
+        )
+        for movie_id, title in (
+            ("my-id-3", "MY MOVIE"),
+            ("my-id", "My Movie"),
+            ("my-id-2", "My Movie 2"),
+        )
+    ]
+    for movie in movie_seed:
+        await memory_movie_repo_fixture.create(movie)
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="my movie", match="insensitive"
+    )
+    assert [movie.id for movie in results] == ["my-id", "my-id-3"]
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="my movie", match="insensitive", after="my-id"
+    )
+    assert [movie.id for movie in results] == ["my-id-3"]
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_prefix(memory_movie_repo_fixture):
+    movie_seed = [
+        Movie(
+            movie_id=movie_id,
+            title=title,
+            description="My description",
+            release_year=1990,
+        )
+        for movie_id, title in (
+            ("a", "The Matrix Reloaded"),
+            ("b", "the matrix"),
+            ("c", "The Matrix"),
+            ("d", "The Mummy"),
+            ("e", "Matrix"),
+        )
+    ]
+    await memory_movie_repo_fixture.create_many(movie_seed)
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="THE MATRIX", match="prefix"
+    )
+    assert [movie.id for movie in results] == ["b", "c", "a"]
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="the matrix", match="prefix", limit=1, after="b", after_title="the matrix"
+    )
+    assert [movie.id for movie in results] == ["c"]
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="the matrix", match="prefix", after="c", after_title="the matrix"
+    )
+    assert [movie.id for movie in results] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_prefix_after_changes(memory_movie_repo_fixture):
+    # Large enough for create_many to rebuild the folded title index.
+    await memory_movie_repo_fixture.create_many(
+        [
+            Movie(
+                movie_id=f"{i:03d}",
+                title=f"Movie {i % 2}",
+                description="My description",
+                release_year=1990,
+            )
+            for i in range(100)
+        ]
+    )
+    await memory_movie_repo_fixture.update("000", {"title": "Other Movie"})
+    await memory_movie_repo_fixture.delete("001")
+    await memory_movie_repo_fixture.create_many(
+        [
+            Movie(
+                movie_id=f"{i:03d}",
+                title=f"Renamed {i}",
+                description="My description",
+                release_year=1990,
+            )
+            for i in range(2, 100)
+        ]
+    )
+    assert (
+        await memory_movie_repo_fixture.get_by_title(title="movie", match="prefix")
+        == []
+    )
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="other", match="prefix"
+    )
+    assert [movie.id for movie in results] == ["000"]
+    results = await memory_movie_repo_fixture.get_by_title(
+        title="renamed", match="prefix", limit=0
+    )
+    assert len(results) == 98
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_unknown_match(memory_movie_repo_fixture):
+    with pytest.raises(RepositoryException):
+        await memory_movie_repo_fixture.get_by_title(title="My Movie", match="regex")
+
+
+@pytest.mark.asyncio
+async def test_get_by_fuzzy_title(memory_movie_repo_fixture):
+    await memory_movie_repo_fixture.create_many(
+        [
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="My description",
+                release_year=1990,
+            )
+            for movie_id, title in (
+                ("a", "The Matrix"),
+                ("b", "The Matrix Reloaded"),
+                ("c", "Casablanca"),
+                ("d", "Matrix"),
+            )
+        ]
+    )
+    await memory_movie_repo_fixture.update("c", {"title": "The Matrix Revolutions"})
+    await memory_movie_repo_fixture.delete("d")
+    results = await memory_movie_repo_fixture.get_by_fuzzy_title(title="the matrx")
+    assert [result.movie.id for result in results] == ["a", "b", "c"]
+    assert results[0].score > results[1].score > results[2].score
+    assert await memory_movie_repo_fixture.get_by_fuzzy_title(title="casablanca") == []
+
+
+@pytest.mark.asyncio
+async def test_search_by_description(memory_movie_repo_fixture):
+    await memory_movie_repo_fixture.create_many(
+        [
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description=description,
+                release_year=1990,
+            )
+            for movie_id, description in (
+                ("a", "A hacker learns the truth about reality."),
+                ("b", "A hacker and a hacker friend hack the bank."),
+                ("c", "Two friends travel across the desert."),
+                ("d", "A hacker story."),
+            )
+        ]
+    )
+    await memory_movie_repo_fixture.update("c", {"description": "The last hacker."})
+    await memory_movie_repo_fixture.delete("d")
+    results = await memory_movie_repo_fixture.search_by_description("Hacker bank")
+    assert [result.movie.id for result in results] == ["b", "c", "a"]
+    assert results[0].score > results[1].score > results[2].score
+    assert await memory_movie_repo_fixture.search_by_description("desert") == []
+
+
+@pytest.mark.asyncio
+async def test_versions(memory_movie_repo_fixture):
+    movie = Movie(
+        movie_id="test",
+        title="My Movie",
+        description="My description",
+        release_year=1990,
+    )
+    await memory_movie_repo_fixture.create(movie)
+    assert (await memory_movie_repo_fixture.get_by_id("test")).version == 1
+    await memory_movie_repo_fixture.update("test", {"watched": True})
+    assert (await memory_movie_repo_fixture.get_by_id("test")).version == 2
+    await memory_movie_repo_fixture.create_many([movie])
+    assert (await memory_movie_repo_fixture.get_by_id("test")).version == 3
+    await memory_movie_repo_fixture.create(movie)
+    assert (await memory_movie_repo_fixture.get_by_id("test")).version == 4
+
+
+@pytest.mark.asyncio
+async def test_update_returns_updated_movie(memory_movie_repo_fixture):
+    await memory_movie_repo_fixture.create(
+        Movie(
+            movie_id="test",
+            title="My Movie",
+            description="My description",
+            release_year=1990,
+        )
+    )
+    movie = await memory_movie_repo_fixture.update("test", {"watched": True})
+    assert movie == await memory_movie_repo_fixture.get_by_id("test")
+    assert movie.watched is True
+    assert movie.version == 2
+
+
+@pytest.mark.asyncio
+async def test_iter_all(memory_movie_repo_fixture):
+    await memory_movie_repo_fixture.create_many(
+        [
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="My description",
+                release_year=1990,
+            )
+            for movie_id in ("c", "a", "b")
+        ]
+    )
+    movies = [movie async for movie in memory_movie_repo_fixture.iter_all()]
+    assert [movie.id for movie in movies] == ["a", "b", "c"]
+    movies = [movie async for movie in memory_movie_repo_fixture.iter_all(after="a")]
+    assert [movie.id for movie in movies] == ["b", "c"]
@@ -1,11 +1,16 @@
+import asyncio
 import secrets
+import typing
 
 import pytest
+from pymongo import monitoring
 
 # noinspection PyUnresolvedReferences
 from api._tests.fixture import mongo_movie_repo_fixture
 from api.entities.movie import Movie
-from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.abstractions import TITLE_MATCHES, RepositoryException
+from api.repository.movie import mongo
+from api.repository.movie.mongo import MOVIE_INDEXES, MongoMovieRepository
 
 
 @pytest.mark.asyncio
@@ -267,7 +272,454 @@ async def test_delete(mongo_movie_repo_fixture):
     )
     await mongo_movie_repo_fixture.create(initial_movie)
     # Test
-    await mongo_movie_repo_fixture.delete(movie_id="first")
-    await mongo_movie_repo_fixture.delete(movie_id=secrets.token_hex(10))
+    deleted = await mongo_movie_repo_fixture.delete(movie_id="first")
+    missing = await mongo_movie_repo_fixture.delete(movie_id=secrets.token_hex(10))
     # Assert
+    assert deleted == initial_movie
+    assert missing is None
     assert await mongo_movie_repo_fixture.get_by_id(movie_id="first") is None
+
+
+def _plan_stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+@pytest.mark.asyncio
+async def test_check_indexes(mongo_movie_repo_fixture):
+    # noinspection PyProtectedMember
+    movies = mongo_movie_repo_fixture._movies
+    await movies.create_index("release_year")
+    report = await mongo_movie_repo_fixture.check_indexes()
+    assert report.missing == [index.document["name"] for index in MOVIE_INDEXES]
+    assert report.unexpected == ["release_year_1"]
+
+    await mongo_movie_repo_fixture.ensure_indexes()
+    # Applying the indexes twice must not fail.
+    await mongo_movie_repo_fixture.ensure_indexes()
+    report = await mongo_movie_repo_fixture.check_indexes()
+    assert report.missing == []
+    assert report.unexpected == ["release_year_1"]
+
+
+class _CommandRecorder(monitoring.CommandListener):
+    """
+    Records the commands sent to MongoDB.
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append((event.command_name, dict(event.command)))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# The commands reading documents, explained by test_queries_use_indexes. The write commands
+# hold their query in their statements.
+_QUERY_COMMANDS = ("find", "aggregate", "count", "distinct", "findAndModify")
+_WRITE_COMMANDS = {"update": "updates", "delete": "deletes"}
+# The fields added by the driver which explain doesn't take.
+_DRIVER_FIELDS = (
+    "lsid",
+    "$db",
+    "$clusterTime",
+    "$readPreference",
+    "txnNumber",
+    "readConcern",
+    "writeConcern",
+    "ordered",
+    "apiVersion",
+)
+
+
+def _explainable(name: str, command: dict) -> typing.Iterator[dict]:
+    command = {
+        key: value for key, value in command.items() if key not in _DRIVER_FIELDS
+    }
+    if name in _QUERY_COMMANDS:
+        yield command
+    elif name in _WRITE_COMMANDS:
+        # explain takes a single statement.
+        statements = command.pop(_WRITE_COMMANDS[name])
+        for statement in statements:
+            yield {**command, _WRITE_COMMANDS[name]: [statement]}
+
+
+def _winning_plans(explanation):
+    if isinstance(explanation, dict):
+        for key, value in explanation.items():
+            if key == "winningPlan":
+                yield value
+            else:
+                yield from _winning_plans(value)
+    elif isinstance(explanation, list):
+        for value in explanation:
+            yield from _winning_plans(value)
+
+
+@pytest.fixture()
+def recorded_mongo_repo_fixture():
+    recorder = _CommandRecorder()
+    random_database_name = secrets.token_hex(5)
+    repo = MongoMovieRepository(
+        connection_string="mongodb://localhost:27017",
+        database=random_database_name,
+        event_listeners=[recorder],
+    )
+    yield repo, recorder
+    # noinspection PyProtectedMember
+    loop = asyncio.get_event_loop_policy().get_event_loop()
+    loop.run_until_complete(repo._client.drop_database(random_database_name))
+
+
+@pytest.mark.asyncio
+async def test_queries_use_indexes(recorded_mongo_repo_fixture):
+    # Setup
+    repo, recorder = recorded_mongo_repo_fixture
+    await repo.ensure_indexes()
+    await repo.create(
+        Movie(
+            movie_id="first",
+            title="My Movie",
+            description="My Movie Description",
+            release_year=2022,
+        )
+    )
+    await repo.create_many(
+        [
+            Movie(
+                movie_id="second",
+                title="My Other Movie",
+                description="My Other Movie Description",
+                release_year=2023,
+            )
+        ]
+    )
+
+    # Test
+    # Every query issued by MongoMovieRepository.
+    recorder.commands.clear()
+    await repo.get_by_id("first")
+    await repo.get_by_id("first", fields=("title",))
+    await repo.get_many(["first", "second"])
+    for match in TITLE_MATCHES:
+        await repo.get_by_title("my movie", match=match)
+        await repo.get_by_title("my movie", skip=1, limit=1, match=match)
+        await repo.get_by_title(
+            "my", after="first", after_title="my movie", match=match
+        )
+    await repo.get_by_title("My Movie", fields=("title",))
+    [movie async for movie in repo.iter_all()]
+    [movie async for movie in repo.iter_all(after="first", fields=("title",))]
+    await repo.get_by_fuzzy_title("My Movei")
+    await repo.search_by_description("movie")
+    await repo.backfill_title_keys()
+    await repo.create(
+        Movie(
+            movie_id="third",
+            title="Third Movie",
+            description="Third Movie Description",
+            release_year=2024,
+        )
+    )
+    await repo.update("first", {"title": "My Updated Movie"})
+    await repo.delete("second")
+    commands = [
+        explainable
+        for name, command in recorder.commands
+        for explainable in _explainable(name, command)
+    ]
+
+    # Assertion
+    names = {name for name, _ in recorder.commands}
+    assert {"find", "aggregate", "update", "findAndModify"} <= names
+    for command in commands:
+        # noinspection PyProtectedMember
+        explanation = await repo._database.command("explain", command)
+        plans = list(_winning_plans(explanation))
+        assert plans, command
+        for plan in plans:
+            assert "COLLSCAN" not in _plan_stages(plan), command
+
+
+@pytest.mark.asyncio
+async def test_create_many(mongo_movie_repo_fixture):
+    movies = [
+        Movie(
+            movie_id="first",
+            title="My Movie",
+            description="My Movie Description",
+            release_year=2022,
+        ),
+        Movie(
+            movie_id="second",
+            title="My Movie",
+            description="My Second Movie Description",
+            release_year=2023,
+            watched=True,
+        ),
+    ]
+    errors = await mongo_movie_repo_fixture.create_many(movies)
+    assert errors == [None, None]
+    assert await mongo_movie_repo_fixture.get_by_id("second") == movies[1]
+    assert await mongo_movie_repo_fixture.get_by_title(title="My Movie") == movies
+
+
+@pytest.mark.asyncio
+async def test_get_many(mongo_movie_repo_fixture):
+    first = Movie(
+        movie_id="first",
+        title="My Movie",
+        description="My Movie Description",
+        release_year=2022,
+    )
+    second = Movie(
+        movie_id="second",
+        title="My Second Movie",
+        description="My Second Movie Description",
+        release_year=2023,
+    )
+    await mongo_movie_repo_fixture.create(first)
+    await mongo_movie_repo_fixture.create(second)
+    movies = await mongo_movie_repo_fixture.get_many(["second", "missing", "first"])
+    assert movies == [second, None, first]
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_after(mongo_movie_repo_fixture):
+    movie_seed = [
+        Movie(
+            movie_id=movie_id,
+            title="My Movie",
+            description="My description",
+            release_year=1990,
+        )
+        for movie_id in ("my-id-3", "my-id", "my-id-2")
+    ]
+    for movie in movie_seed:
+        await mongo_movie_repo_fixture.create(movie)
+    results = await mongo_movie_repo_fixture.get_by_title(
+        title="My Movie", limit=1, after="my-id"
+    )
+    assert [movie.id for movie in results] == ["my-id-2"]
+    results = await mongo_movie_repo_fixture.get_by_title(
+        title="My Movie", after="my-id-2"
+    )
+    assert [movie.id for movie in results] == ["my-id-3"]
+
+
+@pytest.mark.asyncio
+async def test_get_fields(mongo_movie_repo_fixture):
+    await mongo_movie_repo_fixture.create(
+        Movie(
+            movie_id="first",
+            title="My Movie",
+            description="My Movie Description",
+            release_year=2022,
+            watched=True,
+        )
+    )
+    movie = await mongo_movie_repo_fixture.get_by_id("first", fields=["title"])
+    assert (movie.id, movie.title, movie.description) == ("first", "My Movie", None)
+    movies = await mongo_movie_repo_fixture.get_by_title(
+        "My Movie", fields=["release_year"]
+    )
+    assert [(movie.id, movie.release_year, movie.title) for movie in movies] == [
+        ("first", 2022, None)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_prefix(mongo_movie_repo_fixture):
+    movie_seed = [
+        Movie(
+            movie_id=movie_id,
+            title=title,
+            description="My description",
+            release_year=1990,
+        )
+        for movie_id, title in (
+            ("a", "The Matrix Reloaded"),
+            ("b", "the matrix"),
+            ("c", "The Matrix"),
+            ("d", "The Mummy"),
+        )
+    ]
+    await mongo_movie_repo_fixture.create_many(movie_seed)
+    results = await mongo_movie_repo_fixture.get_by_title(
+        title="THE MATRIX", match="prefix"
+    )
+    assert [movie.id for movie in results] == ["b", "c", "a"]
+    results = await mongo_movie_repo_fixture.get_by_title(
+        title="the matrix", match="prefix", after="c", after_title="the matrix"
+    )
+    assert [movie.id for movie in results] == ["a"]
+    results = await mongo_movie_repo_fixture.get_by_title(
+        title="the matrix", match="insensitive"
+    )
+    assert [movie.id for movie in results] == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_backfill_title_keys(mongo_movie_repo_fixture):
+    # noinspection PyProtectedMember
+    await mongo_movie_repo_fixture._movies.insert_one(
+        {"id": "first", "title": "My Movie", "description": "", "release_year": 1990}
+    )
+    assert await mongo_movie_repo_fixture.backfill_title_keys() == 1
+    results = await mongo_movie_repo_fixture.get_by_title(title="my", match="prefix")
+    assert [movie.id for movie in results] == ["first"]
+    results = await mongo_movie_repo_fixture.get_by_fuzzy_title(title="my movei")
+    assert [result.movie.id for result in results] == ["first"]
+
+
+@pytest.mark.asyncio
+async def test_get_by_fuzzy_title(mongo_movie_repo_fixture):
+    await mongo_movie_repo_fixture.create_many(
+        [
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description="My description",
+                release_year=1990,
+            )
+            for movie_id, title in (
+                ("a", "The Matrix"),
+                ("b", "The Matrix Reloaded"),
+                ("c", "Casablanca"),
+            )
+        ]
+    )
+    await mongo_movie_repo_fixture.update("c", {"title": "The Matrix Revolutions"})
+    results = await mongo_movie_repo_fixture.get_by_fuzzy_title(
+        title="the matrx", limit=2
+    )
+    assert [result.movie.id for result in results] == ["a", "b"]
+    assert results[0].score > results[1].score
+    assert results[0].movie.title == "The Matrix"
+
+
+@pytest.mark.asyncio
+async def test_get_by_fuzzy_title_candidates_cap(mongo_movie_repo_fixture, monkeypatch):
+    # More titles hold the probed trigrams than the cap, the best one is written last.
+    monkeypatch.setattr(mongo, "FUZZY_MAX_CANDIDATES", 5)
+    movies = [
+        Movie(
+            movie_id=f"{i:02}",
+            title=f"Matrix Sequel {i}",
+            description="My description",
+            release_year=1990,
+        )
+        for i in range(20)
+    ]
+    movies.append(
+        Movie(
+            movie_id="99",
+            title="The Matrix",
+            description="My description",
+            release_year=1990,
+        )
+    )
+    await mongo_movie_repo_fixture.create_many(movies)
+    results = await mongo_movie_repo_fixture.get_by_fuzzy_title(
+        title="the matrix", limit=1
+    )
+    assert [result.movie.id for result in results] == ["99"]
+
+
+@pytest.mark.asyncio
+async def test_search_by_description(mongo_movie_repo_fixture):
+    await mongo_movie_repo_fixture.ensure_indexes()
+    await mongo_movie_repo_fixture.create_many(
+        [
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description=description,
+                release_year=1990,
+            )
+            for movie_id, description in (
+                ("a", "A hacker learns the truth about reality."),
+                ("b", "A hacker and a hacker friend hack the bank."),
+                ("c", "Two friends travel across the desert."),
+            )
+        ]
+    )
+    results = await mongo_movie_repo_fixture.search_by_description("hacker")
+    assert {result.movie.id for result in results} == {"a", "b"}
+    assert results[0].score >= results[1].score
+
+
+@pytest.mark.asyncio
+async def test_versions(mongo_movie_repo_fixture):
+    movie = Movie(
+        movie_id="first",
+        title="My Movie",
+        description="My Movie Description",
+        release_year=2022,
+    )
+    await mongo_movie_repo_fixture.create(movie)
+    assert (await mongo_movie_repo_fixture.get_by_id("first")).version == 1
+    await mongo_movie_repo_fixture.update("first", {"watched": True})
+    assert (await mongo_movie_repo_fixture.get_by_id("first")).version == 2
+    await mongo_movie_repo_fixture.create_many([movie])
+    assert (await mongo_movie_repo_fixture.get_by_id("first")).version == 3
+
+
+@pytest.mark.asyncio
+async def test_update_returns_updated_movie(mongo_movie_repo_fixture):
+    await mongo_movie_repo_fixture.create(
+        Movie(
+            movie_id="first",
+            title="My Movie",
+            description="My Movie Description",
+            release_year=2022,
+        )
+    )
+    movie = await mongo_movie_repo_fixture.update("first", {"title": "Other Movie"})
+    assert movie == Movie(
+        movie_id="first",
+        title="Other Movie",
+        description="My Movie Description",
+        release_year=2022,
+    )
+    assert movie.version == 2
+    with pytest.raises(RepositoryException):
+        await mongo_movie_repo_fixture.update("missing", {"watched": True})
+
+
+@pytest.mark.asyncio
+async def test_iter_all(mongo_movie_repo_fixture):
+    await mongo_movie_repo_fixture.create_many(
+        [
+            Movie(
+                movie_id=movie_id,
+                title="My Movie",
+                description="My Movie Description",
+                release_year=2022,
+            )
+            for movie_id in ("c", "a", "b")
+        ]
+    )
+    movies = [movie async for movie in mongo_movie_repo_fixture.iter_all()]
+    assert [movie.id for movie in movies] == ["a", "b", "c"]
+    movies = [
+        movie
+        async for movie in mongo_movie_repo_fixture.iter_all(
+            after="a", fields=("title",)
+        )
+    ]
+    assert [(movie.id, movie.title) for movie in movies] == [
+        ("b", "My Movie"),
+        ("c", "My Movie"),
+    ]
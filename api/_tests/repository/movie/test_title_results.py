@@ -0,0 +1,115 @@
+import pytest
+
+from api._tests.fixture import CountingMovieRepository, FakeClock, make_movie
+from api.entities.movie import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.title_results import (
+    ENTRY_OVERHEAD,
+    TitleResultCache,
+    TitleResultInvalidatingMovieRepository,
+)
+
+
+def test_serves_until_title_written():
+    cache = TitleResultCache()
+    cache.store("key", "My Movie", cache.generation("My Movie"), b"[]", {"ETag": "x"})
+
+    assert cache.lookup("key") == (b"[]", {"ETag": "x"})
+    cache.bump(["Other Movie"])
+    assert cache.lookup("key") == (b"[]", {"ETag": "x"})
+    cache.bump(["MY MOVIE"])
+    assert cache.lookup("key") is None
+    assert len(cache) == 0
+
+
+def test_skips_results_read_before_a_write():
+    cache = TitleResultCache()
+    generation = cache.generation("My Movie")
+    cache.bump(["My Movie"])
+    cache.store("key", "My Movie", generation, b"[]", {})
+
+    assert cache.lookup("key") is None
+
+
+def test_bounded_by_bytes():
+    body = b"x" * 1000
+    cache = TitleResultCache(max_bytes=2 * (ENTRY_OVERHEAD + len(body)))
+    for key in ("first", "second", "third"):
+        cache.store(key, key, cache.generation(key), body, {})
+
+    assert cache.lookup("first") is None
+    assert cache.lookup("second") == (body, {})
+    assert cache.lookup("third") == (body, {})
+    assert cache.nbytes == 2 * (ENTRY_OVERHEAD + len(body))
+
+
+def test_expires():
+    clock = FakeClock()
+    cache = TitleResultCache(ttl=5, clock=clock)
+    cache.store("key", "My Movie", cache.generation("My Movie"), b"[]", {})
+    clock.now = 5
+
+    assert cache.lookup("key") is None
+
+
+def test_generations_reset():
+    cache = TitleResultCache(max_generations=1)
+    cache.store("key", "My Movie", cache.generation("My Movie"), b"[]", {})
+    cache.bump(["first"])
+    assert cache.lookup("key") == (b"[]", {})
+    cache.bump(["second"])
+
+    assert cache.lookup("key") is None
+
+
+@pytest.mark.asyncio
+async def test_writes_bump_previous_and_new_titles():
+    cache = TitleResultCache()
+    repo = TitleResultInvalidatingMovieRepository(MemoryMovieRepository(), cache)
+    await repo.create(make_movie("first", title="Old Title"))
+    old = cache.generation("Old Title")
+    new = cache.generation("New Title")
+
+    await repo.update("first", {"title": "New Title"})
+
+    assert cache.generation("Old Title") != old
+    assert cache.generation("New Title") != new
+    new = cache.generation("New Title")
+    await repo.delete("first")
+    assert cache.generation("New Title") != new
+
+
+@pytest.mark.asyncio
+async def test_writes_without_overwrites_skip_reads():
+    cache = TitleResultCache()
+    backend = CountingMovieRepository()
+    repo = TitleResultInvalidatingMovieRepository(backend, cache, overwrites=False)
+    title = cache.generation("Title")
+
+    await repo.create(make_movie("first", title="Title"))
+    await repo.create_many([make_movie("second", title="Title")])
+    assert cache.generation("Title") != title
+    title = cache.generation("Title")
+    await repo.update("first", {"watched": True})
+    assert cache.generation("Title") != title
+    title = cache.generation("Title")
+    await repo.delete("second")
+    assert cache.generation("Title") != title
+    assert backend.get_by_id_calls == 0
+    assert backend.get_many_calls == []
+
+
+@pytest.mark.asyncio
+async def test_overwrites_bump_replaced_titles():
+    cache = TitleResultCache()
+    backend = CountingMovieRepository()
+    repo = TitleResultInvalidatingMovieRepository(backend, cache)
+    await repo.create(make_movie("first", title="Old Title"))
+    await repo.create_many([make_movie("second", title="Old Title")])
+    old = cache.generation("Old Title")
+
+    await repo.create(make_movie("first", title="New Title"))
+    assert cache.generation("Old Title") != old
+    old = cache.generation("Old Title")
+    await repo.create_many([make_movie("second", title="New Title")])
+    assert cache.generation("Old Title") != old
@@ -0,0 +1,57 @@
+import random
+
+from api.repository.movie.trigrams import TrigramIndex, padded_title, title_trigrams
+
+
+def test_title_trigrams():
+    assert title_trigrams("Up!") == {"  u", " up", "up "}
+    assert title_trigrams("UP up") == title_trigrams("up")
+    assert title_trigrams("...") == set()
+
+
+def test_padded_title_holds_the_trigrams():
+    padded = padded_title("The Matrix, Reloaded")
+    assert all(trigram in padded for trigram in title_trigrams("the matrix reloaded"))
+    assert "e  " in padded and "e  " not in title_trigrams("the matrix reloaded")
+
+
+def test_search_matches_brute_force():
+    rng = random.Random(7)
+    words = ["alien", "aliens", "matrix", "star", "wars", "trek", "the", "return"]
+    titles = {
+        str(i): " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        for i in range(500)
+    }
+    index = TrigramIndex()
+    for movie_id, title in titles.items():
+        index.add(movie_id, title)
+    # Removed and renamed titles must not be found under their old title.
+    for movie_id in list(titles)[:100]:
+        index.remove(movie_id)
+        del titles[movie_id]
+    for movie_id in list(titles)[:50]:
+        titles[movie_id] = "star trek"
+        index.add(movie_id, "star trek")
+
+    for query in ("alein", "star wasr", "the matrix return"):
+        trigrams = title_trigrams(query)
+        expected = []
+        for movie_id, title in titles.items():
+            other = title_trigrams(title)
+            score = len(trigrams & other) / len(trigrams | other)
+            if score >= 0.3:
+                expected.append((movie_id, score))
+        expected.sort(key=lambda result: (-result[1], result[0]))
+        assert index.search(query, limit=10, threshold=0.3) == expected[:10]
+
+
+def test_compaction():
+    index = TrigramIndex()
+    for i in range(3000):
+        index.add(str(i), f"movie {i}")
+    for i in range(2500):
+        index.remove(str(i))
+    assert len(index) == 500
+    # noinspection PyProtectedMember
+    assert len(index._ids) < 3000
+    assert [movie_id for movie_id, _ in index.search("movie 2999", limit=1)] == ["2999"]
@@ -0,0 +1,101 @@
+import pytest
+from starlette.testclient import TestClient
+
+from api.api import create_app, create_mongo_movie_repository
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.title_results import TitleResultInvalidatingMovieRepository
+from api.settings import Settings, settings_instance
+
+
+class StubMongoMovieRepository(MemoryMovieRepository):
+    """
+    StubMongoMovieRepository stands for MongoMovieRepository, recording the calls made by
+    the startup and shutdown of the app.
+    """
+
+    min_pool_size = 3
+
+    def __init__(self):
+        super().__init__()
+        self.connections = None
+        self.closed = False
+
+    async def connect(self, connections: int = 1):
+        self.connections = connections
+
+    def close(self):
+        self.closed = True
+
+
+def _pool_options(settings: Settings) -> dict:
+    repo = create_mongo_movie_repository(settings)
+    # noinspection PyProtectedMember
+    pool_options = repo._client.options.pool_options
+    repo.close()
+    return {
+        "max_pool_size": pool_options.max_pool_size,
+        "min_pool_size": pool_options.min_pool_size,
+        "max_idle_time_seconds": pool_options.max_idle_time_seconds,
+    }
+
+
+def test_pool_options_from_connection_string():
+    settings = Settings(
+        mongo_connection_string=(
+            "mongodb://localhost:27017/?maxPoolSize=5&minPoolSize=2&maxIdleTimeMS=1000"
+        )
+    )
+    assert _pool_options(settings) == {
+        "max_pool_size": 5,
+        "min_pool_size": 2,
+        "max_idle_time_seconds": 1.0,
+    }
+
+
+def test_pool_settings_override_connection_string():
+    settings = Settings(
+        mongo_connection_string="mongodb://localhost:27017/?maxPoolSize=5",
+        mongo_max_pool_size=20,
+        mongo_min_pool_size=4,
+    )
+    assert _pool_options(settings) == {
+        "max_pool_size": 20,
+        "min_pool_size": 4,
+        "max_idle_time_seconds": None,
+    }
+
+
+def test_startup_and_shutdown(monkeypatch):
+    # Setup
+    repo = StubMongoMovieRepository()
+    monkeypatch.setattr("api.api.create_mongo_movie_repository", lambda settings: repo)
+    settings = settings_instance()
+    monkeypatch.setattr(settings, "enable_metrics", False)
+    monkeypatch.setattr(settings, "mongo_manage_indexes", False)
+    monkeypatch.setattr(settings, "title_result_cache_enabled", True)
+    app = create_app()
+
+    # Test
+    with TestClient(app) as client:
+        result = client.post(
+            "/api/v1/movies/",
+            json={
+                "title": "My Movie",
+                "description": "My description",
+                "release_year": 2000,
+            },
+        )
+        created = client.get(f"/api/v1/movies/{result.json()['id']}")
+        closed_while_running = repo.closed
+
+    # Assertion
+    assert result.status_code == 201
+    assert created.status_code == 200
+    assert repo.connections == 3
+    assert app.state.mongo_movie_repository is repo
+    assert isinstance(
+        app.state.movie_repository, TitleResultInvalidatingMovieRepository
+    )
+    assert app.state.title_result_cache is not None
+    assert not closed_while_running
+    assert repo.closed
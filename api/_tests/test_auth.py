@@ -0,0 +1,63 @@
+import time
+
+import pytest
+import rsa
+from jose import JWTError, jwt
+
+from api._tests.fixture import FakeClock
+from api.auth import JWTVerifier
+
+
+@pytest.fixture(scope="module")
+def key_pair():
+    public_key, private_key = rsa.newkeys(1024)
+    return public_key.save_pkcs1().decode(), private_key.save_pkcs1().decode()
+
+
+def test_verify(key_pair):
+    public_key, private_key = key_pair
+    verifier = JWTVerifier(public_key)
+    token = jwt.encode({"name": "admin", "admin": True}, private_key, algorithm="RS256")
+    assert verifier.verify(token) == {"name": "admin", "admin": True}
+    # Served from the cache.
+    assert verifier.verify(token) == {"name": "admin", "admin": True}
+
+
+def test_verify_invalid_signature(key_pair):
+    public_key, _ = key_pair
+    _, other_private_key = rsa.newkeys(1024)
+    verifier = JWTVerifier(public_key)
+    token = jwt.encode(
+        {"name": "admin"}, other_private_key.save_pkcs1().decode(), algorithm="RS256"
+    )
+    with pytest.raises(JWTError):
+        verifier.verify(token)
+    # A failed verification is not cached.
+    with pytest.raises(JWTError):
+        verifier.verify(token)
+
+
+def test_verify_cache_expires_with_token(key_pair, monkeypatch):
+    public_key, private_key = key_pair
+    expires_at = int(time.time()) + 3600
+    clock = FakeClock(now=expires_at - 60)
+    verifier = JWTVerifier(public_key, clock=clock)
+    token = jwt.encode(
+        {"name": "admin", "exp": expires_at}, private_key, algorithm="RS256"
+    )
+    decode_calls = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decode_calls.append(args)
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+    verifier.verify(token)
+    clock.now = expires_at - 1
+    verifier.verify(token)
+    assert len(decode_calls) == 1
+    # Past its exp claim the token is verified again.
+    clock.now = expires_at
+    verifier.verify(token)
+    assert len(decode_calls) == 2
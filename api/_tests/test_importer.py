@@ -0,0 +1,153 @@
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from api.importer import (
+    CatalogImporter,
+    movie_id_of,
+    read_checkpoint,
+    trim_errors,
+)
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+class FailingMovieRepository(MemoryMovieRepository):
+    """
+    FailingMovieRepository fails the create_many calls once fail_after calls succeeded.
+    """
+
+    def __init__(self, fail_after: int):
+        super().__init__()
+        self.fail_after = fail_after
+
+    async def create_many(self, movies):
+        if self.fail_after == 0:
+            raise RuntimeError("backend failure")
+        self.fail_after -= 1
+        return await super().create_many(movies)
+
+
+def _jsonl(count: int) -> str:
+    return "".join(
+        json.dumps(
+            {
+                "title": f"My Movie {i}",
+                "description": "My description",
+                "release_year": 1990,
+            }
+        )
+        + "\n"
+        for i in range(count)
+    )
+
+
+@pytest.mark.asyncio
+async def test_import_jsonl():
+    repo = MemoryMovieRepository()
+    errors = io.StringIO()
+    catalog = _jsonl(5) + '{"title": "My"}\nnot json\n\n'
+    importer = CatalogImporter(repo, batch_size=2, concurrency=2, errors=errors)
+
+    stats = await importer.run(io.StringIO(catalog), "jsonl")
+
+    assert (stats.records, stats.imported, stats.invalid, stats.failed) == (8, 5, 2, 0)
+    movie = await repo.get_by_id(movie_id_of("My Movie 3", 1990, "My description"))
+    assert movie.title == "My Movie 3"
+    assert [json.loads(line)["record"] for line in errors.getvalue().splitlines()] == [
+        6,
+        7,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_csv():
+    repo = MemoryMovieRepository()
+    catalog = (
+        "id,title,description,release_year,watched\n"
+        "first,My Movie,My description,1990,true\n"
+        ",My Other Movie,My description,1991,\n"
+    )
+    importer = CatalogImporter(repo)
+
+    stats = await importer.run(io.StringIO(catalog), "csv")
+
+    assert stats.imported == 2
+    assert (await repo.get_by_id("first")).watched is True
+    assert (
+        await repo.get_by_id(movie_id_of("My Other Movie", 1991, "My description"))
+    ).watched is False
+
+
+@pytest.mark.asyncio
+async def test_reports_derived_id_collisions():
+    repo = MemoryMovieRepository()
+    errors = io.StringIO()
+    remake = {
+        "title": "My Movie",
+        "description": "My description",
+        "release_year": 1990,
+    }
+    catalog = "".join(
+        json.dumps(record) + "\n"
+        for record in (
+            remake,
+            dict(remake, description="My remake description"),
+            remake,
+            dict(remake, id="remake"),
+        )
+    )
+    importer = CatalogImporter(repo, batch_size=2, concurrency=2, errors=errors)
+
+    stats = await importer.run(io.StringIO(catalog), "jsonl")
+
+    assert (stats.imported, stats.invalid) == (3, 1)
+    assert len(await repo.get_by_title("My Movie")) == 3
+    error = json.loads(errors.getvalue())
+    assert error["record"] == 3
+    assert "record 1" in error["error"]
+
+
+@pytest.mark.asyncio
+async def test_resume_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint")
+    repo = FailingMovieRepository(fail_after=2)
+    catalog = _jsonl(7)
+    importer = CatalogImporter(repo, batch_size=2, concurrency=1, checkpoint=checkpoint)
+
+    with pytest.raises(RuntimeError):
+        await importer.run(io.StringIO(catalog), "jsonl")
+    assert read_checkpoint(checkpoint) == 4
+    repo.fail_after = 10
+    stats = await importer.run(io.StringIO(catalog), "jsonl")
+
+    assert stats.records == 7
+    assert stats.imported == 3
+    assert read_checkpoint(checkpoint) == 7
+    assert len(await repo.get_by_title("My Movie 6", match="prefix")) == 1
+
+
+@pytest.mark.asyncio
+async def test_validates_in_processes():
+    repo = MemoryMovieRepository()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        importer = CatalogImporter(repo, batch_size=2, executor=executor)
+        stats = await importer.run(io.StringIO(_jsonl(3)), "jsonl")
+
+    assert stats.imported == 3
+
+
+def test_trim_errors(tmp_path):
+    path = str(tmp_path / "errors.jsonl")
+    with open(path, "w") as file:
+        for record in (2, 5, 9):
+            file.write(json.dumps({"record": record, "error": "invalid"}) + "\n")
+
+    trim_errors(path, 5)
+    with open(path) as file:
+        assert [json.loads(line)["record"] for line in file] == [2, 5]
+    trim_errors(path, 0)
+    with open(path) as file:
+        assert file.read() == ""
+    trim_errors(str(tmp_path / "missing.jsonl"), 5)
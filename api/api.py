@@ -1,8 +1,95 @@
+from logging import getLogger
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 from api.handlers import movie_v1
 from api.middleware import PrometheusMiddleware
+from api.repository.movie.abstractions import MovieRepository
+from api.repository.movie.batching import BatchingMovieRepository
+from api.repository.movie.caching import CachingMovieRepository
+from api.repository.movie.coalescing import CoalescingMovieRepository
+from api.repository.movie.instrumented import InstrumentedMovieRepository
+from api.repository.movie.mongo import MongoMovieRepository
+from api.repository.movie.title_results import (
+    TitleResultCache,
+    TitleResultInvalidatingMovieRepository,
+)
+from api.settings import Settings, settings_instance
+
+
+async def manage_indexes(repo: MongoMovieRepository):
+    """
+    Reports missing or unexpected indexes of the movie collection and creates the missing ones,
+    then sets the title keys of the movies stored without them.
+    """
+    logger = getLogger("api.indexes")
+    report = await repo.check_indexes()
+    if report.missing:
+        logger.warning("missing indexes: %s", ", ".join(report.missing))
+    if report.unexpected:
+        logger.warning("unexpected indexes: %s", ", ".join(report.unexpected))
+    await repo.ensure_indexes()
+    logger.info("indexes ensured")
+    backfilled = await repo.backfill_title_keys()
+    if backfilled:
+        logger.info("title keys backfilled: %d", backfilled)
+
+
+def create_mongo_movie_repository(settings: Settings) -> MongoMovieRepository:
+    """
+    Creates the MongoDB movie repository with the connection pool configured by the settings.
+
+    Only the pool settings which are set are given to the client, since they override the
+    options of the connection string.
+    """
+    pool_options = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+    }
+    client_options = {
+        name: value for name, value in pool_options.items() if value is not None
+    }
+    if settings.mongo_compressors:
+        client_options["compressors"] = settings.mongo_compressors
+    return MongoMovieRepository(
+        connection_string=settings.mongo_connection_string,
+        database=settings.mongo_database_name,
+        cursor_batch_size=settings.mongo_cursor_batch_size,
+        export_batch_size=settings.mongo_export_batch_size,
+        **client_options,
+    )
+
+
+def wrap_movie_repository(
+    repo: MovieRepository, backend: str, settings: Settings
+) -> MovieRepository:
+    """
+    Wraps the movie repository with the layers enabled by the settings.
+    """
+    if settings.enable_metrics:
+        # Innermost, so only the calls reaching the backend are recorded.
+        repo = InstrumentedMovieRepository(repo, backend=backend)
+    if settings.movie_batching_enabled:
+        # Below the cache, so only the cache misses are batched.
+        repo = BatchingMovieRepository(
+            repo,
+            window=settings.movie_batch_window,
+            max_batch_size=settings.movie_batch_max_size,
+        )
+    if settings.movie_create_coalescing_enabled:
+        repo = CoalescingMovieRepository(
+            repo,
+            window=settings.movie_create_coalesce_window,
+            max_batch_size=settings.movie_create_coalesce_max_size,
+        )
+    if settings.movie_cache_enabled:
+        repo = CachingMovieRepository(
+            repo, max_size=settings.movie_cache_max_size, ttl=settings.movie_cache_ttl
+        )
+    return repo
 
 
 def create_app():
@@ -26,4 +113,36 @@ def create_app():
     # app.include_router(demo.router)
     app.include_router(movie_v1.router)
 
+    # Events
+    @app.on_event("startup")
+    async def open_movie_repository():
+        logger = getLogger("api.repository")
+        settings: Settings = settings_instance()
+        repo = create_mongo_movie_repository(settings)
+        app.state.mongo_movie_repository = repo
+        # Open the minimum pool size up front so the first requests don't wait for it.
+        await repo.connect(connections=repo.min_pool_size)
+        logger.info("mongo connected")
+        if settings.mongo_manage_indexes:
+            await manage_indexes(repo)
+        movie_repository = wrap_movie_repository(repo, "mongo", settings)
+        if settings.title_result_cache_enabled:
+            title_result_cache = TitleResultCache(
+                max_bytes=settings.title_result_cache_max_bytes,
+                ttl=settings.title_result_cache_ttl,
+            )
+            app.state.title_result_cache = title_result_cache
+            # Outermost, so every write of the API invalidates the cached title queries.
+            # The API creates the movies with new ids, they never replace one.
+            movie_repository = TitleResultInvalidatingMovieRepository(
+                movie_repository, title_result_cache, overwrites=False
+            )
+        app.state.movie_repository = movie_repository
+
+    @app.on_event("shutdown")
+    async def close_movie_repository():
+        repo = getattr(app.state, "mongo_movie_repository", None)
+        if repo is not None:
+            repo.close()
+
     return app
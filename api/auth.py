@@ -0,0 +1,72 @@
+"""
+    JWT verification shared by the API handlers.
+"""
+import hashlib
+import time
+import typing
+from collections import OrderedDict
+
+from jose import jwk, jwt
+
+
+class JWTVerifier:
+    """
+    JWTVerifier verifies JWT signatures with a public key parsed once, and keeps the claims of
+    the tokens it verified in a bounded cache. A cached token is trusted until its exp claim
+    (or max_age seconds if it comes first), so clients reusing a bearer token pay for the
+    signature verification once.
+    """
+
+    def __init__(
+        self,
+        public_key: str,
+        algorithm: str = "RS256",
+        max_size: int = 10_000,
+        max_age: float = 300.0,
+        clock: typing.Callable[[], float] = time.time,
+    ):
+        """
+        Parameters
+        ----------
+        public_key: str
+            The PEM encoded public key verifying the token signatures.
+        algorithm: str
+            The only signature algorithm accepted.
+        max_size: int
+            The maximum number of verified tokens held by the cache.
+        max_age: float
+            The maximum number of seconds a verified token is served from the cache.
+        clock: Callable
+            Returns the current unix time in seconds, compared against the exp claims.
+        """
+        self._key = jwk.construct(public_key, algorithm)
+        self._algorithm = algorithm
+        self._max_size = max_size
+        self._max_age = max_age
+        self._clock = clock
+        # token sha256 digest -> (expiration time, claims), least recently used first.
+        self._verified: "OrderedDict[bytes, typing.Tuple[float, dict]]" = OrderedDict()
+
+    def verify(self, token: str) -> dict:
+        """
+        Returns the claims of the token.
+
+        Raises JWTError if the token is invalid or expired.
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        now = self._clock()
+        entry = self._verified.get(digest)
+        if entry is not None:
+            expires_at, claims = entry
+            if expires_at > now:
+                self._verified.move_to_end(digest)
+                return claims
+            del self._verified[digest]
+        claims = jwt.decode(token, self._key, algorithms=[self._algorithm])
+        expires_at = now + self._max_age
+        if isinstance(claims.get("exp"), (int, float)):
+            expires_at = min(expires_at, claims["exp"])
+        self._verified[digest] = (expires_at, claims)
+        while len(self._verified) > self._max_size:
+            self._verified.popitem(last=False)
+        return claims
@@ -36,6 +36,19 @@ class MovieCreatedResponse(BaseModel):
     id: str
 
 
+class BulkMovieCreatedItem(BaseModel):
+    """
+    BulkMovieCreatedItem holds the outcome of one movie of a bulk create request.
+    """
+
+    id: typing.Optional[str] = None
+    error: typing.Optional[str] = None
+
+
+class BulkMovieCreatedResponse(BaseModel):
+    items: typing.List[BulkMovieCreatedItem]
+
+
 class MovieResponse(MovieCreatedResponse):
     title: str
     description: str
@@ -43,8 +56,25 @@ class MovieResponse(MovieCreatedResponse):
     watched: bool
 
 
+class ScoredMovieResponse(MovieResponse):
+    """
+    ScoredMovieResponse is a movie found by a search, with the score it was ranked by.
+    """
+
+    score: float
+
+
 class MovieUpdateBody(BaseModel):
     title: typing.Optional[str] = None
     description: typing.Optional[str] = None
     release_year: typing.Optional[int] = None
     watched: typing.Optional[bool] = None
+
+
+class MoviesByIdsResponse(BaseModel):
+    """
+    MoviesByIdsResponse holds the movies found for a list of ids, in request order, and the ids not found.
+    """
+
+    movies: typing.List[MovieResponse]
+    not_found: typing.List[str]
@@ -1,4 +1,14 @@
 class Movie:
+    """
+    Movie is immutable, use replace to get a modified copy. Its attributes are stored in slots
+    instead of a per instance dict to keep the memory footprint of large catalogs low.
+    """
+
+    __slots__ = ("_id", "_title", "_description", "_release_year", "_watched", "_version")
+
+    # The names of the fields which can be changed with replace.
+    FIELDS = ("title", "description", "release_year", "watched")
+
     def __init__(
         self,
         *,
@@ -6,7 +16,8 @@ class Movie:
         title: str,
         description: str,
         release_year: int,
-        watched: bool = False
+        watched: bool = False,
+        version: int = 0
     ):
         """
             Parameters
@@ -21,6 +32,8 @@ class Movie:
                 The release year of the movie.
             watched: bool
                 Boolean that indicates if the movie has been watched.
+            version: int
+                Incremented by the repositories on every write of the movie, 0 until it is stored.
 
             Return
             ------
@@ -39,6 +52,7 @@ class Movie:
         self._description = description
         self._release_year = release_year
         self._watched = watched
+        self._version = version
 
     @property
     def id(self) -> str:
@@ -60,7 +74,12 @@ class Movie:
     def watched(self) -> bool:
         return self._watched
 
+    @property
+    def version(self) -> int:
+        return self._version
+
     def __eq__(self, o: object) -> bool:
+        # The version tells writes apart, it isn't part of the movie content.
         if not isinstance(o, Movie):
             return False
         return (
@@ -70,3 +89,60 @@ class Movie:
             and self.release_year == o.release_year
             and self.watched == o.watched
         )
+
+    def __repr__(self) -> str:
+        return (
+            f"Movie(movie_id={self.id!r}, title={self.title!r}, "
+            f"description={self.description!r}, release_year={self.release_year!r}, "
+            f"watched={self.watched!r}, version={self.version!r})"
+        )
+
+    def replace(self, **changes) -> "Movie":
+        """
+            Parameters
+            ----------
+            **changes
+                The new values of the fields to change, from Movie.FIELDS.
+
+            Return
+            ------
+            Movie
+                A copy of the movie with the given fields changed.
+
+            Raises
+            ------
+            TypeError
+                 Raised when a change is not a field from Movie.FIELDS.
+        """
+        unknown = changes.keys() - set(self.FIELDS)
+        if unknown:
+            raise TypeError(f"unknown movie fields: {', '.join(sorted(unknown))}")
+        return Movie(
+            movie_id=self._id,
+            title=changes.get("title", self._title),
+            description=changes.get("description", self._description),
+            release_year=changes.get("release_year", self._release_year),
+            watched=changes.get("watched", self._watched),
+            version=self._version,
+        )
+
+    def with_version(self, version: int) -> "Movie":
+        """
+            Parameters
+            ----------
+            version: int
+                The version of the copy.
+
+            Return
+            ------
+            Movie
+                A copy of the movie with the given version.
+        """
+        return Movie(
+            movie_id=self._id,
+            title=self._title,
+            description=self._description,
+            release_year=self._release_year,
+            watched=self._watched,
+            version=version,
+        )
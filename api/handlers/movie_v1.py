@@ -1,39 +1,119 @@
+import base64
 import dataclasses
+import json
 import typing
 import uuid
 from collections import namedtuple
 from functools import lru_cache
 
-from fastapi import APIRouter, Body, Depends, Query, Path, Header, HTTPException
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Query,
+    Path,
+    Header,
+    HTTPException,
+    Request,
+)
 from fastapi.encoders import jsonable_encoder
-from jose import jwt, JWTError
+from fastapi.responses import ORJSONResponse
+from jose import JWTError
+from pydantic import ValidationError
 from starlette import status
-from starlette.responses import JSONResponse, Response
+from starlette.responses import JSONResponse, Response, StreamingResponse
 
 from api.dto.movie import (
+    BulkMovieCreatedItem,
+    BulkMovieCreatedResponse,
     CreateMovieBody,
     MovieCreatedResponse,
     MovieResponse,
     MovieUpdateBody,
+    MoviesByIdsResponse,
+    ScoredMovieResponse,
 )
 from api.entities.movie import Movie
-from api.repository.movie.abstractions import MovieRepository, RepositoryException
-from api.repository.movie.mongo import MongoMovieRepository
+from api.repository.movie.abstractions import (
+    TITLE_EXACT,
+    TITLE_MATCHES,
+    TITLE_PREFIX,
+    MovieRepository,
+    RepositoryException,
+    fold_title,
+)
+from api.repository.movie.title_results import TitleResultCache
+from api.responses import (
+    MovieJSONResponse,
+    accepts_gzip,
+    etag_matches,
+    gzip_chunks,
+    joined_chunks,
+    movie_etag,
+    movie_to_dict,
+    ndjson_lines,
+    page_etag,
+)
+from api.auth import JWTVerifier
 from api.dto.detail import DetailResponse
-from api.settings import Settings, settings_instance
 
 router = APIRouter(prefix="/api/v1/movies", tags=["movies"])
 
+# The maximum number of movies accepted by a single bulk create request.
+BULK_CREATE_LIMIT = 10_000
+# The movie fields which can be selected with the fields query parameter.
+MOVIE_FIELDS = ("id", "title", "description", "release_year", "watched")
+# Media type of the streamed newline delimited JSON responses.
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# The maximum number of ids accepted by a single get movies by ids request.
+GET_MANY_LIMIT = 1000
+# The maximum number of movies returned by a single search request.
+SEARCH_LIMIT = 100
 
-@lru_cache()
-def movie_repository(settings: Settings = Depends(settings_instance)):
+
+def movie_repository(request: Request) -> MovieRepository:
     """
     Movie repository instance to be used as a Fast API dependency.
+
+    The repository is created on the application startup and closed on its shutdown.
     """
-    return MongoMovieRepository(
-        connection_string=settings.mongo_connection_string,
-        database=settings.mongo_database_name,
-    )
+    return request.app.state.movie_repository
+
+
+def title_result_cache(request: Request) -> typing.Optional[TitleResultCache]:
+    """
+    Title result cache instance to be used as a Fast API dependency, None when disabled.
+    """
+    return getattr(request.app.state, "title_result_cache", None)
+
+
+def encode_cursor(movie_id: str, title: typing.Optional[str] = None) -> str:
+    """
+    Encodes the id of the last movie of a page into an opaque pagination cursor.
+
+    title is the folded title of the movie, needed by the pages ordered by title first.
+    """
+    position = {"id": movie_id}
+    if title is not None:
+        position["title"] = title
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> typing.Tuple[str, typing.Optional[str]]:
+    """
+    Decodes a pagination cursor created by encode_cursor into a movie id and a folded title.
+
+    Raises HTTPException if the cursor is invalid.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        movie_id = position["id"]
+        title = position.get("title")
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail="invalid cursor") from e
+    if not isinstance(movie_id, str) or not isinstance(title, (str, type(None))):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return movie_id, title
 
 
 def pagination_params(
@@ -44,9 +124,39 @@ def pagination_params(
         description="The limit of the number of items returned",
         le=1000,
     ),
+    after: typing.Optional[str] = Query(
+        None,
+        title="After",
+        description="The cursor returned in the X-Next-Cursor header of the previous page.",
+    ),
 ):
-    Pagination = namedtuple("Pagination", ["skip", "limit"])
-    return Pagination(skip=skip, limit=limit)
+    Pagination = namedtuple("Pagination", ["skip", "limit", "after", "after_title"])
+    after_id, after_title = (None, None) if after is None else decode_cursor(after)
+    return Pagination(
+        skip=skip,
+        limit=limit,
+        after=after_id,
+        after_title=after_title,
+    )
+
+
+def fields_params(
+    fields: typing.Optional[str] = Query(
+        None,
+        title="Fields",
+        description="Comma separated movie fields to return besides id, all of them if not set.",
+    ),
+) -> typing.Optional[typing.Tuple[str, ...]]:
+    if fields is None:
+        return None
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in MOVIE_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"unknown fields: {', '.join(unknown)}"
+        )
+    # The id is always returned.
+    return tuple(dict.fromkeys(field for field in selected if field != "id"))
 
 
 @router.post("/", status_code=201, response_model=MovieCreatedResponse)
@@ -71,14 +181,63 @@ async def post_create_movie(
     return MovieCreatedResponse(id=movie_id)
 
 
+@router.post("/bulk", status_code=201, response_model=BulkMovieCreatedResponse)
+async def post_create_movies_bulk(
+    # Any items, so a movie which isn't an object fails alone like the other invalid ones.
+    movies: typing.List[typing.Any] = Body(
+        ...,
+        title="Movies",
+        description="The details of the movies, each one following the create movie body.",
+        max_items=BULK_CREATE_LIMIT,
+    ),
+    repo: MovieRepository = Depends(movie_repository),
+):
+    """
+    Creates multiple movies, returns the id or the error of every movie in request order.
+    """
+    items = [BulkMovieCreatedItem() for _ in movies]
+    valid_movies = []
+    valid_positions = []
+    for position, movie_body in enumerate(movies):
+        if not isinstance(movie_body, dict):
+            items[position].error = "movie: not an object"
+            continue
+        try:
+            movie = CreateMovieBody.parse_obj(movie_body)
+        except ValidationError as e:
+            items[position].error = "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )
+            continue
+        valid_movies.append(
+            Movie(
+                movie_id=str(uuid.uuid4()),
+                title=movie.title,
+                description=movie.description,
+                release_year=movie.release_year,
+                watched=movie.watched,
+            )
+        )
+        valid_positions.append(position)
+
+    errors = await repo.create_many(movies=valid_movies)
+    for position, movie, error in zip(valid_positions, valid_movies, errors):
+        if error is None:
+            items[position].id = movie.id
+        else:
+            items[position].error = error
+    return BulkMovieCreatedResponse(items=items)
+
+
 @dataclasses.dataclass
 class Token:
     name: str
     admin: bool
 
 
-def authenticate_jwt(authorization: typing.Union[str, None] = Header(default=None)):
-    token_secret = """-----BEGIN PUBLIC KEY-----
+# Public key verifying the bearer tokens, parsed once by the verifier.
+JWT_PUBLIC_KEY = """-----BEGIN PUBLIC KEY-----
 MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEAu1SU1LfVLPHCozMxH2Mo
 4lgOEePzNm0tRgeLezV6ffAt0gunVTLw7onLRnrq0/IzW7yWR7QkrmBL7jTKEn5u
 +qKhbwKfBstIs+bMY2Zkp18gnTxKLxoS2tFczGkPLPgizskuemMghRniWaoLcyeh
@@ -87,13 +246,27 @@ kd3qqGElvW/VDL5AaWTg0nLVkjRo9z+40RQzuVaE8AkAFmxZzow3x+VJYKdjykkJ
 cKWTjpBP2dPwVZ4WWC+9aGVd+Gyn1o0CLelf4rEjGoXbAAEgAqeGUxrcIlbjXfbc
 mwIDAQAB
 -----END PUBLIC KEY-----"""
+
+
+@lru_cache()
+def jwt_verifier() -> JWTVerifier:
+    """
+    JWT verifier instance to be used as a Fast API dependency.
+    """
+    return JWTVerifier(public_key=JWT_PUBLIC_KEY, algorithm="RS256")
+
+
+def authenticate_jwt(
+    authorization: typing.Union[str, None] = Header(default=None),
+    verifier: JWTVerifier = Depends(jwt_verifier),
+):
     if authorization is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token"
         )
     token = authorization.split(" ")[1]
     try:
-        token_payload = jwt.decode(token, token_secret, algorithms=["RS256"])
+        token_payload = verifier.verify(token)
     except JWTError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token"
@@ -104,17 +277,136 @@ mwIDAQAB
     )
 
 
+@router.get("/batch", response_model=MoviesByIdsResponse)
+async def get_movies_by_ids(
+    ids: typing.List[str] = Query(
+        ...,
+        title="IDs",
+        description="The ids of the movies, repeat the parameter for every id.",
+        max_items=GET_MANY_LIMIT,
+    ),
+    repo: MovieRepository = Depends(movie_repository),
+):
+    """
+    Returns the movies found for the given ids in request order, and the ids which were not found.
+    """
+    movies = await repo.get_many(movie_ids=ids)
+    found = []
+    not_found = []
+    for movie_id, movie in zip(ids, movies):
+        if movie is None:
+            not_found.append(movie_id)
+            continue
+        found.append(movie_to_dict(movie))
+    return ORJSONResponse({"movies": found, "not_found": not_found})
+
+
+@router.get("/fuzzy", response_model=typing.List[ScoredMovieResponse])
+async def get_movies_by_fuzzy_title(
+    title: str = Query(
+        ..., title="Title", description="The title to search for.", min_length=3
+    ),
+    limit: int = Query(
+        10,
+        title="Limit",
+        description="The maximum number of movies returned.",
+        ge=1,
+        le=SEARCH_LIMIT,
+    ),
+    threshold: float = Query(
+        0.3,
+        title="Threshold",
+        description="The minimum similarity of the returned titles, between 0 and 1.",
+        gt=0,
+        le=1,
+    ),
+    repo: MovieRepository = Depends(movie_repository),
+):
+    """
+    Returns the movies with the titles most similar to title, most similar first.
+
+    The score is the similarity of the trigrams of the titles, ignoring the case, so
+    misspelled titles still find their movies.
+    """
+    results = await repo.get_by_fuzzy_title(title, limit=limit, threshold=threshold)
+    return ORJSONResponse(
+        [dict(movie_to_dict(result.movie), score=result.score) for result in results]
+    )
+
+
+@router.get("/search", response_model=typing.List[ScoredMovieResponse])
+async def search_movies(
+    q: str = Query(
+        ...,
+        title="Query",
+        description="The words to search for in the movie descriptions.",
+        min_length=1,
+    ),
+    limit: int = Query(
+        10,
+        title="Limit",
+        description="The maximum number of movies returned.",
+        ge=1,
+        le=SEARCH_LIMIT,
+    ),
+    repo: MovieRepository = Depends(movie_repository),
+):
+    """
+    Returns the movies with the descriptions best matching the words of q, best first.
+
+    The score ranks the movies of one search, it is not comparable across searches.
+    """
+    results = await repo.search_by_description(q, limit=limit)
+    return ORJSONResponse(
+        [dict(movie_to_dict(result.movie), score=result.score) for result in results]
+    )
+
+
+@router.get("/export", responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}})
+async def export_movies(
+    after: typing.Optional[str] = Query(
+        None,
+        title="After",
+        description="The id of the last movie received, to resume an interrupted export.",
+    ),
+    fields: typing.Optional[typing.Tuple[str, ...]] = Depends(fields_params),
+    accept_encoding: typing.Optional[str] = Header(None),
+    repo: MovieRepository = Depends(movie_repository),
+):
+    """
+    Streams every movie as newline delimited JSON, ordered by id.
+
+    The movies are sent while they are read from the database, so the memory used doesn't
+    depend on the size of the catalog. If the Accept-Encoding header allows gzip the stream
+    is compressed on the fly.
+    """
+    body = joined_chunks(
+        ndjson_lines(repo.iter_all(after=after, fields=fields), fields)
+    )
+    headers = {"Vary": "Accept-Encoding"}
+    if accepts_gzip(accept_encoding):
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
 @router.get(
     "/{movie_id}",
     responses={200: {"model": MovieResponse}, 404: {"model": DetailResponse}},
 )
 async def get_movie_by_id(
-    movie_id: str, repo: MovieRepository = Depends(movie_repository)
+    movie_id: str,
+    fields: typing.Optional[typing.Tuple[str, ...]] = Depends(fields_params),
+    if_none_match: typing.Optional[str] = Header(None),
+    repo: MovieRepository = Depends(movie_repository),
 ):
     """
     Returns a Movie if found, None otherwise.
+
+    The ETag response header changes with every write of the movie. When the If-None-Match
+    request header holds it the response is a 304 without a body.
     """
-    movie = await repo.get_by_id(movie_id=movie_id)
+    movie = await repo.get_by_id(movie_id=movie_id, fields=fields)
     if movie is None:
         return JSONResponse(
             status_code=404,
@@ -122,47 +414,114 @@ async def get_movie_by_id(
                 DetailResponse(message=f"Movie with id {movie_id} is not found.")
             ),
         )
-    return MovieResponse(
-        id=movie.id,
-        title=movie.title,
-        description=movie.description,
-        release_year=movie.release_year,
-        watched=movie.watched,
-    )
+    headers = {"ETag": movie_etag(movie, fields)}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return MovieJSONResponse(movie, fields=fields, headers=headers)
 
 
-@router.get("/", response_model=typing.List[MovieResponse])
+@router.get(
+    "/",
+    response_model=typing.List[MovieResponse],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
 async def get_movies_by_title(
     title: str = Query(
         ..., title="Title", description="The title of the movie.", min_length=3
     ),
+    match: str = Query(
+        TITLE_EXACT,
+        title="Match",
+        description="exact, insensitive to ignore the case, or prefix to match the titles "
+        "starting with the given one, ignoring the case.",
+        regex=f"^({'|'.join(TITLE_MATCHES)})$",
+    ),
     pagination=Depends(pagination_params),
+    fields: typing.Optional[typing.Tuple[str, ...]] = Depends(fields_params),
+    accept: typing.Optional[str] = Header(None),
+    if_none_match: typing.Optional[str] = Header(None),
     repo: MovieRepository = Depends(movie_repository),
+    cache: typing.Optional[TitleResultCache] = Depends(title_result_cache),
 ):
     """
     This handler returns movies by filtering their title.
+
+    When the page is full the X-Next-Cursor response header holds the cursor of the next page,
+    to be sent in the after query parameter. Unlike skip, paging with after costs the same
+    for every page.
+
+    Exact and insensitive matches are ordered by id, prefix matches by title and then id.
+
+    If the Accept header is application/x-ndjson the movies are streamed as newline delimited
+    JSON while they are read from the database. Streamed responses don't have X-Next-Cursor.
+
+    Pages have a weak ETag, when the If-None-Match request header holds it the response is a
+    304 without a body. Streamed responses don't have an ETag.
     """
+    if accept is not None and NDJSON_MEDIA_TYPE in accept:
+        return StreamingResponse(
+            ndjson_lines(
+                repo.iter_by_title(
+                    title,
+                    skip=pagination.skip,
+                    limit=pagination.limit,
+                    after=pagination.after,
+                    fields=fields,
+                    match=match,
+                    after_title=pagination.after_title,
+                ),
+                fields,
+            ),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+    cache_key = None
+    if cache is not None and match != TITLE_PREFIX:
+        # A write invalidates the queries of its title only, so the prefix matches spanning
+        # many titles aren't cached.
+        cache_key = (title, match, tuple(pagination), fields)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            body, headers = cached
+            if etag_matches(if_none_match, headers["ETag"]):
+                return Response(status_code=304, headers=headers)
+            return Response(body, media_type="application/json", headers=headers)
+        generation = cache.generation(title)
+    read_fields = fields
+    if match == TITLE_PREFIX and fields is not None and "title" not in fields:
+        # The cursor of a prefix match holds the title of the last movie.
+        read_fields = fields + ("title",)
     movies = await repo.get_by_title(
-        title, skip=pagination.skip, limit=pagination.limit
+        title,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        after=pagination.after,
+        fields=read_fields,
+        match=match,
+        after_title=pagination.after_title,
     )
-    movies_return_value = []
-    for movie in movies:
-        movies_return_value.append(
-            MovieResponse(
-                id=movie.id,
-                title=movie.title,
-                description=movie.description,
-                release_year=movie.release_year,
-                watched=movie.watched,
-            )
-        )
-    return movies_return_value
+    headers = {}
+    if movies and len(movies) == pagination.limit:
+        last = movies[-1]
+        if match == TITLE_PREFIX:
+            headers["X-Next-Cursor"] = encode_cursor(last.id, fold_title(last.title))
+        else:
+            headers["X-Next-Cursor"] = encode_cursor(last.id)
+    headers["ETag"] = page_etag(movies, fields)
+    not_modified = etag_matches(if_none_match, headers["ETag"])
+    if not_modified and cache_key is None:
+        return Response(status_code=304, headers=headers)
+    response = MovieJSONResponse(movies, fields=fields, headers=headers)
+    if cache_key is not None:
+        cache.store(cache_key, title, generation, response.body, headers)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return response
 
 
 @router.patch(
     "/{movie_id}",
     responses={
-        200: {"model": DetailResponse},
+        200: {"model": MovieResponse},
         400: {"model": DetailResponse},
     },
 )
@@ -176,20 +535,20 @@ async def patch_update_movie(
     repo: MovieRepository = Depends(movie_repository),
 ):
     """
-    Updates a movie.
+    Updates a movie, returns the updated movie.
     """
     try:
-        await repo.update(
+        movie = await repo.update(
             movie_id=movie_id,
             update_parameters=update_parameters.dict(
                 exclude_unset=True, exclude_none=True
             ),
         )
-        return DetailResponse(message="Movie updated.")
     except RepositoryException as e:
         return JSONResponse(
             status_code=400, content=jsonable_encoder(DetailResponse(message=str(e)))
         )
+    return MovieJSONResponse(movie, headers={"ETag": movie_etag(movie)})
 
 
 @router.delete("/{movie_id}", status_code=204)
@@ -0,0 +1,436 @@
+"""
+    Streams a JSONL or CSV catalog of movies into the movie repository, in batches written
+    concurrently, without loading the file in memory.
+
+    Usage: python -m api.importer movies.jsonl [--format jsonl] [--batch-size 1000]
+        [--concurrency 4] [--workers 4] [--checkpoint movies.jsonl.checkpoint]
+        [--errors errors.jsonl]
+"""
+import argparse
+import asyncio
+import csv
+import dataclasses
+import itertools
+import json
+import os
+import sys
+import time
+import typing
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from pydantic import ValidationError
+
+from api.dto.movie import CreateMovieBody
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import MovieRepository
+
+FORMATS = ("jsonl", "csv")
+
+# Namespace of the ids of the imported movies without one, derived from their title,
+# release year and description so importing a catalog again updates its movies instead of
+# duplicating them.
+IMPORT_NAMESPACE = uuid.UUID("0b5c8f5e-3a55-4c36-9a55-7c1b8f0e6d2a")
+
+# (id, title, description, release_year, watched), cheaper to send back from the
+# validation processes than Movie entities.
+_MovieValues = typing.Tuple[str, str, str, int, bool]
+
+
+def movie_id_of(title: str, release_year: int, description: str) -> str:
+    """
+    Returns the id given to an imported movie without one.
+    """
+    return str(uuid.uuid5(IMPORT_NAMESPACE, f"{title}\n{release_year}\n{description}"))
+
+
+def validate_records(
+    records: typing.List[typing.Union[str, dict]], file_format: str
+) -> typing.Tuple[
+    typing.List[typing.Tuple[int, _MovieValues, bool]],
+    typing.List[typing.Tuple[int, str]],
+]:
+    """
+    Validates raw records against the rules of CreateMovieBody.
+
+    Returns the position in records, the values and whether the id was derived of the valid
+    movies, and the position and error message of the invalid ones. Runs in the validation
+    processes.
+    """
+    movies = []
+    errors = []
+    for position, record in enumerate(records):
+        if file_format == "jsonl":
+            if not record.strip():
+                continue
+            try:
+                record = json.loads(record)
+            except ValueError as e:
+                errors.append((position, f"invalid json: {e}"))
+                continue
+            if not isinstance(record, dict):
+                errors.append((position, "invalid json: not an object"))
+                continue
+        else:
+            # Empty CSV cells are missing values, the columns past the header are ignored.
+            record = {
+                column: value
+                for column, value in record.items()
+                if column is not None and value != ""
+            }
+            if not record:
+                continue
+        try:
+            movie = CreateMovieBody.parse_obj(record)
+        except ValidationError as e:
+            errors.append(
+                (
+                    position,
+                    "; ".join(
+                        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                        for error in e.errors()
+                    ),
+                )
+            )
+            continue
+        movie_id = record.get("id")
+        derived = not movie_id
+        if derived:
+            movie_id = movie_id_of(movie.title, movie.release_year, movie.description)
+        movies.append(
+            (
+                position,
+                (
+                    str(movie_id),
+                    movie.title,
+                    movie.description,
+                    movie.release_year,
+                    movie.watched,
+                ),
+                derived,
+            )
+        )
+    return movies, errors
+
+
+def read_records(
+    file: typing.TextIO, file_format: str
+) -> typing.Iterator[typing.Union[str, dict]]:
+    """
+    Yields the raw records of a catalog one at a time: the lines of a JSONL file, the rows
+    of a CSV file with a header as dicts.
+    """
+    if file_format == "jsonl":
+        return iter(file)
+    if file_format == "csv":
+        return iter(csv.DictReader(file))
+    raise ValueError(f"unknown format: {file_format}")
+
+
+def read_checkpoint(path: str) -> int:
+    """
+    Returns the number of records imported according to a checkpoint file, 0 without one.
+    """
+    try:
+        with open(path) as file:
+            return json.load(file)["records"]
+    except FileNotFoundError:
+        return 0
+
+
+def trim_errors(path: str, records: int):
+    """
+    Drops the lines of an errors file about the records after the first records, which are
+    imported again on resume. The whole file is emptied without records.
+    """
+    temporary = f"{path}.tmp"
+    try:
+        with open(path) as file, open(temporary, "w") as trimmed:
+            for line in file:
+                if records and json.loads(line)["record"] <= records:
+                    trimmed.write(line)
+    except FileNotFoundError:
+        return
+    os.replace(temporary, path)
+
+
+def write_checkpoint(path: str, records: int):
+    """
+    Writes the number of records imported to a checkpoint file, atomically.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump({"records": records}, file)
+    os.replace(temporary, path)
+
+
+@dataclasses.dataclass
+class ImportStats:
+    # Records read from the file, including the ones skipped by the checkpoint.
+    records: int = 0
+    imported: int = 0
+    invalid: int = 0
+    failed: int = 0
+
+
+class CatalogImporter:
+    """
+    CatalogImporter reads a catalog in batches of records, validates every batch in an
+    executor and writes its valid movies with a single create_many.
+
+    At most concurrency batches are in flight, being validated or written, which bounds the
+    memory used. The checkpoint holds the number of records of the batches imported without
+    a gap, so an interrupted import resumes after them. Batches written again on resume
+    update the same movies, since the ids are derived from the records. The batches are
+    written in any order, so of two records with the same id either one may win.
+
+    The records without an id whose title, release year and description were already seen
+    by the run would replace the same movie, they are reported as errors and skipped. The
+    derived ids are kept for the whole run to find them.
+    """
+
+    def __init__(
+        self,
+        repository: MovieRepository,
+        batch_size: int = 1000,
+        concurrency: int = 4,
+        executor: typing.Optional[Executor] = None,
+        checkpoint: typing.Optional[str] = None,
+        errors: typing.Optional[typing.TextIO] = None,
+        report: typing.Callable[[str], None] = lambda line: None,
+        report_every: float = 5.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        """
+        Parameters
+        ----------
+        repository: MovieRepository
+            The repository the movies are written to.
+        batch_size: int
+            The number of records validated and written together.
+        concurrency: int
+            The maximum number of batches in flight.
+        executor: Executor
+            Validates the batches, a process pool to use several cores. The batches are
+            validated in the event loop if not set.
+        checkpoint: str
+            The path of the checkpoint file, the import isn't resumable if not set.
+        errors: TextIO
+            Receives a JSON line with the record number and the error of every record
+            which is invalid or failed to be written.
+        report: Callable
+            Receives the progress lines.
+        report_every: float
+            The number of seconds between two progress lines.
+        clock: Callable
+            Returns the current time in seconds, used for the rates.
+        """
+        self._repository = repository
+        self._batch_size = batch_size
+        self._concurrency = concurrency
+        self._executor = executor
+        self._checkpoint = checkpoint
+        self._errors = errors
+        self._report = report
+        self._report_every = report_every
+        self._clock = clock
+        # derived id -> record number of the first record given it.
+        self._derived: typing.Dict[str, int] = {}
+
+    async def run(self, file: typing.TextIO, file_format: str) -> ImportStats:
+        """
+        Imports the records of the file, after the ones of the checkpoint.
+        """
+        stats = ImportStats()
+        self._derived = {}
+        records = read_records(file, file_format)
+        if self._checkpoint is not None:
+            stats.records = read_checkpoint(self._checkpoint)
+            for _ in itertools.islice(records, stats.records):
+                pass
+        started_at = self._clock()
+        resumed_at = stats.records
+        reported_at = started_at
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+        # The number of records of the batches in flight or imported after a gap, by
+        # position of their first record.
+        finished: typing.Dict[int, int] = {}
+        in_flight: typing.Dict[int, int] = {}
+        committed = stats.records
+        tasks: typing.Set[asyncio.Future] = set()
+        failures: typing.List[BaseException] = []
+
+        def batch_done(first: int, task: asyncio.Future):
+            nonlocal committed, reported_at
+            semaphore.release()
+            tasks.discard(task)
+            if task.cancelled():
+                return
+            if task.exception() is not None:
+                failures.append(task.exception())
+                return
+            finished[first] = in_flight.pop(first)
+            advanced = False
+            while committed in finished:
+                committed += finished.pop(committed)
+                advanced = True
+            if advanced and self._checkpoint is not None:
+                write_checkpoint(self._checkpoint, committed)
+            now = self._clock()
+            if now - reported_at >= self._report_every:
+                reported_at = now
+                self._report(self._progress(stats, resumed_at, now - started_at))
+
+        try:
+            while True:
+                await semaphore.acquire()
+                batch = list(itertools.islice(records, self._batch_size))
+                if not batch:
+                    semaphore.release()
+                    break
+                first = stats.records
+                stats.records += len(batch)
+                in_flight[first] = len(batch)
+                task = asyncio.ensure_future(
+                    self._import_batch(first, batch, file_format, stats)
+                )
+                tasks.add(task)
+                task.add_done_callback(
+                    lambda task, first=first: batch_done(first, task)
+                )
+                # A failed write stops the import, its batch and the next ones are
+                # imported again on resume.
+                if failures:
+                    raise failures[0]
+            if tasks:
+                await asyncio.gather(*tasks)
+            if failures:
+                raise failures[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        self._report(self._progress(stats, resumed_at, self._clock() - started_at))
+        return stats
+
+    async def _import_batch(
+        self,
+        first: int,
+        batch: typing.List[typing.Union[str, dict]],
+        file_format: str,
+        stats: ImportStats,
+    ):
+        if self._executor is None:
+            movies, errors = validate_records(batch, file_format)
+        else:
+            movies, errors = await asyncio.get_running_loop().run_in_executor(
+                self._executor, validate_records, batch, file_format
+            )
+        unique = []
+        for position, values, derived in movies:
+            if derived:
+                seen = self._derived.setdefault(values[0], first + position)
+                if seen != first + position:
+                    errors.append(
+                        (
+                            position,
+                            "same title, release year and description as record "
+                            f"{seen + 1}, add an id to import both",
+                        )
+                    )
+                    continue
+            unique.append((position, values))
+        stats.invalid += len(errors)
+        for position, error in errors:
+            self._error(first + position, error)
+        if not unique:
+            return
+        write_errors = await self._repository.create_many(
+            [
+                Movie(
+                    movie_id=movie_id,
+                    title=title,
+                    description=description,
+                    release_year=release_year,
+                    watched=watched,
+                )
+                for _, (movie_id, title, description, release_year, watched) in unique
+            ]
+        )
+        for (position, (movie_id, *_)), error in zip(unique, write_errors):
+            if error is None:
+                stats.imported += 1
+            else:
+                stats.failed += 1
+                self._error(first + position, f"movie: {movie_id} not created: {error}")
+
+    def _error(self, record: int, error: str):
+        if self._errors is not None:
+            # Records are numbered from 1, like the lines of a JSONL file.
+            self._errors.write(
+                json.dumps({"record": record + 1, "error": error}) + "\n"
+            )
+
+    @staticmethod
+    def _progress(stats: ImportStats, resumed_at: int, elapsed: float) -> str:
+        rate = (stats.records - resumed_at) / elapsed if elapsed > 0 else 0.0
+        return (
+            f"records: {stats.records}, imported: {stats.imported}, "
+            f"invalid: {stats.invalid}, failed: {stats.failed}, {rate:.0f} records/s"
+        )
+
+
+async def main(args: argparse.Namespace):
+    # Imported here so the validation processes don't import the app.
+    from api.api import create_mongo_movie_repository
+    from api.settings import settings_instance
+
+    repository = create_mongo_movie_repository(settings_instance())
+    errors = None
+    if args.errors:
+        # The records after the checkpoint are imported again, and their errors with them.
+        trim_errors(
+            args.errors, read_checkpoint(args.checkpoint) if args.checkpoint else 0
+        )
+        errors = open(args.errors, "a")
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor, open(
+            args.path, newline=""
+        ) as file:
+            importer = CatalogImporter(
+                repository,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                executor=executor,
+                checkpoint=args.checkpoint,
+                errors=errors,
+                report=lambda line: print(line, file=sys.stderr, flush=True),
+            )
+            await importer.run(file, args.format or _format_of(args.path))
+    finally:
+        if errors is not None:
+            errors.close()
+        repository.close()
+
+
+def _format_of(path: str) -> str:
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    if extension == "ndjson":
+        return "jsonl"
+    if extension not in FORMATS:
+        raise SystemExit(f"unknown format of {path}, set it with --format")
+    return extension
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--checkpoint", default=None)
+    parser.add_argument("--errors", default=None)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""
+    Prometheus metrics recorded by the API, exposed by PrometheusMiddleware next to the HTTP metrics.
+"""
+from prometheus_client import Counter, Histogram
+
+MOVIE_CACHE_HITS = Counter(
+    "movie_cache_hits", "Number of get_by_id calls served from the movie cache."
+)
+MOVIE_CACHE_MISSES = Counter(
+    "movie_cache_misses", "Number of get_by_id calls not found in the movie cache."
+)
+MOVIE_CACHE_EVICTIONS = Counter(
+    "movie_cache_evictions",
+    "Number of movies evicted from the movie cache.",
+    ["reason"],
+)
+
+TITLE_RESULT_CACHE_HITS = Counter(
+    "title_result_cache_hits",
+    "Number of title queries served from the title result cache.",
+)
+TITLE_RESULT_CACHE_MISSES = Counter(
+    "title_result_cache_misses",
+    "Number of title queries not found in the title result cache.",
+)
+TITLE_RESULT_CACHE_EVICTIONS = Counter(
+    "title_result_cache_evictions",
+    "Number of query results evicted from the title result cache.",
+    ["reason"],
+)
+
+MOVIE_REPOSITORY_LATENCY = Histogram(
+    "movie_repository_call_seconds",
+    "Latency of the MovieRepository calls.",
+    ["backend", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+MOVIE_REPOSITORY_RESULTS = Histogram(
+    "movie_repository_results",
+    "Number of movies read or written by the MovieRepository calls.",
+    ["backend", "operation"],
+    buckets=(0, 1, 10, 100, 1000, 10000),
+)
+MOVIE_REPOSITORY_ERRORS = Counter(
+    "movie_repository_errors",
+    "Number of MovieRepository calls which raised an exception.",
+    ["backend", "operation"],
+)
+
+MOVIE_BATCH_SIZE = Histogram(
+    "movie_batch_size",
+    "Number of movie ids read by a batched get_by_id call.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+MOVIE_BATCH_WAIT = Histogram(
+    "movie_batch_wait_seconds",
+    "Time a get_by_id call waited for its batch to be sent.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05),
+)
+
+MOVIE_CREATE_BATCH_SIZE = Histogram(
+    "movie_create_batch_size",
+    "Number of movies written by a coalesced create call.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+MOVIE_CREATE_BATCH_WAIT = Histogram(
+    "movie_create_batch_wait_seconds",
+    "Time a create call waited for its batch to be sent.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05),
+)
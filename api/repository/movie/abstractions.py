@@ -1,8 +1,27 @@
 import abc
 import typing
+from collections import namedtuple
 
 from api.entities.movie import Movie
 
+# How get_by_title compares the titles: exact matches the title as is, insensitive ignores
+# the case and prefix matches the titles starting with it, ignoring the case.
+TITLE_EXACT = "exact"
+TITLE_INSENSITIVE = "insensitive"
+TITLE_PREFIX = "prefix"
+TITLE_MATCHES = (TITLE_EXACT, TITLE_INSENSITIVE, TITLE_PREFIX)
+
+
+def fold_title(title: str) -> str:
+    """
+    Returns the title used by the case insensitive matches.
+    """
+    return title.casefold()
+
+
+# A movie found by a search, with the score it was ranked by.
+ScoredMovie = namedtuple("ScoredMovie", ["movie", "score"])
+
 
 class RepositoryException(Exception):
     pass
@@ -17,30 +36,225 @@ class MovieRepository(abc.ABC):
         """
         raise NotImplementedError
 
-    async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
+    async def create_many(
+        self, movies: typing.List[Movie]
+    ) -> typing.List[typing.Optional[str]]:
+        """
+        Inserts multiple movies into the database, a failing movie doesn't stop the others.
+
+        Returns a list with an error message for every movie that couldn't be inserted, None otherwise.
+        """
+        raise NotImplementedError
+
+    async def get_by_id(
+        self, movie_id: str, fields: typing.Optional[typing.Sequence[str]] = None
+    ) -> typing.Optional[Movie]:
         """
         Retrieves a Movie by it's ID and if the movie is not found it will return None.
+
+        fields are the names of the Movie fields needed besides the ID, all of them if None.
+        The repository may leave the other fields set to None.
+        """
+        raise NotImplementedError
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        """
+        Retrieves Movies by their IDs, in the order of movie_ids and with None for every movie not found.
         """
         raise NotImplementedError
 
     async def get_by_title(
-        self, title: str, skip: int = 0, limit: int = 1000
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
     ) -> typing.List[Movie]:
         """
-        Returns a list of movies which share the same title.
+        Returns a list of movies which share the same title, ordered by their ID.
+
+        If after is set only the movies with an ID greater than after are returned, which allows
+        paging with the ID of the last movie of the previous page instead of skipping movies.
+
+        fields are the names of the Movie fields needed besides the ID, all of them if None.
+        The repository may leave the other fields set to None.
+
+        match is one of TITLE_MATCHES. Prefix matches span many titles, so they are ordered by
+        the folded title and then the ID; after_title is the folded title of the movie given
+        in after.
+
+        Raises RepositoryException if match is unknown.
+        """
+        raise NotImplementedError
+
+    def iter_by_title(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        """
+        Same as get_by_title, but yields the movies as they are read instead of returning a list.
+        """
+        raise NotImplementedError
+
+    def iter_all(
+        self,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        """
+        Yields every movie ordered by ID, as they are read.
+
+        If after is set only the movies with an ID greater than after are yielded, so an
+        interrupted iteration resumes from the ID of the last movie read. fields works as in
+        get_by_title.
+        """
+        raise NotImplementedError
+
+    async def get_by_fuzzy_title(
+        self, title: str, limit: int = 10, threshold: float = 0.3
+    ) -> typing.List[ScoredMovie]:
+        """
+        Returns the limit movies with the titles most similar to title, most similar first.
+
+        The score is the Jaccard similarity of the trigrams of the titles, ignoring the case.
+        Only the movies at least threshold similar are returned.
         """
         raise NotImplementedError
 
-    async def update(self, movie_id: str, update_parameters: dict):
+    async def search_by_description(
+        self, query: str, limit: int = 10
+    ) -> typing.List[ScoredMovie]:
         """
-        Update a movie by it's id.
+        Returns the limit movies with the descriptions best matching the words of the query,
+        best first. Only the movies holding at least one of the words are returned.
+
+        The score is the relevance computed by the repository, it can only be compared
+        between the movies of the same search.
         """
         raise NotImplementedError
 
-    async def delete(self, movie_id: str):
+    async def update(self, movie_id: str, update_parameters: dict) -> Movie:
+        """
+        Update a movie by it's id, returns the updated movie.
+
+        Raises RepositoryException if the movie is not found.
         """
-        Deletes a movie by it's id.
+        raise NotImplementedError
+
+    async def delete(self, movie_id: str) -> typing.Optional[Movie]:
+        """
+        Deletes a movie by it's id, returns the deleted movie or None if it wasn't found.
 
         Raises RepositoryException of failure.
         """
         raise NotImplementedError
+
+
+class DelegatingMovieRepository(MovieRepository):
+    """
+    DelegatingMovieRepository wraps another MovieRepository and forwards every call to it.
+    The wrapping repositories extend it and only override the methods they intercept.
+    """
+
+    def __init__(self, repository: MovieRepository):
+        """
+        Parameters
+        ----------
+        repository: MovieRepository
+            The repository to read through and write to.
+        """
+        self._repository = repository
+
+    async def create(self, movie: Movie):
+        await self._repository.create(movie)
+
+    async def create_many(
+        self, movies: typing.List[Movie]
+    ) -> typing.List[typing.Optional[str]]:
+        return await self._repository.create_many(movies)
+
+    async def get_by_id(
+        self, movie_id: str, fields: typing.Optional[typing.Sequence[str]] = None
+    ) -> typing.Optional[Movie]:
+        return await self._repository.get_by_id(movie_id, fields=fields)
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        return await self._repository.get_many(movie_ids)
+
+    async def get_by_title(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
+    ) -> typing.List[Movie]:
+        return await self._repository.get_by_title(
+            title,
+            skip=skip,
+            limit=limit,
+            after=after,
+            fields=fields,
+            match=match,
+            after_title=after_title,
+        )
+
+    def iter_by_title(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        return self._repository.iter_by_title(
+            title,
+            skip=skip,
+            limit=limit,
+            after=after,
+            fields=fields,
+            match=match,
+            after_title=after_title,
+        )
+
+    def iter_all(
+        self,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        return self._repository.iter_all(after=after, fields=fields)
+
+    async def get_by_fuzzy_title(
+        self, title: str, limit: int = 10, threshold: float = 0.3
+    ) -> typing.List[ScoredMovie]:
+        return await self._repository.get_by_fuzzy_title(
+            title, limit=limit, threshold=threshold
+        )
+
+    async def search_by_description(
+        self, query: str, limit: int = 10
+    ) -> typing.List[ScoredMovie]:
+        return await self._repository.search_by_description(query, limit=limit)
+
+    async def update(self, movie_id: str, update_parameters: dict) -> Movie:
+        return await self._repository.update(movie_id, update_parameters)
+
+    async def delete(self, movie_id: str) -> typing.Optional[Movie]:
+        return await self._repository.delete(movie_id)
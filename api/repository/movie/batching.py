@@ -0,0 +1,99 @@
+import asyncio
+import time
+import typing
+
+from api.entities.movie import Movie
+from api.metrics import MOVIE_BATCH_SIZE, MOVIE_BATCH_WAIT
+from api.repository.movie.abstractions import (
+    DelegatingMovieRepository,
+    MovieRepository,
+)
+
+
+class BatchingMovieRepository(DelegatingMovieRepository):
+    """
+    BatchingMovieRepository wraps another MovieRepository and gathers the get_by_id calls
+    made within a short window into a single get_many call, like a DataLoader. Every caller
+    gets the movie of its own id, the concurrent calls for the same id share it.
+    """
+
+    def __init__(
+        self,
+        repository: MovieRepository,
+        window: float = 0.0,
+        max_batch_size: int = 100,
+    ):
+        """
+        Parameters
+        ----------
+        repository: MovieRepository
+            The repository to read through and write to.
+        window: float
+            The number of seconds a batch waits for more calls after its first one. With 0
+            the batch holds the calls made within the current event loop iteration.
+        max_batch_size: int
+            The maximum number of ids of a batch, a full batch is sent right away.
+        """
+        super().__init__(repository)
+        self._window = window
+        self._max_batch_size = max_batch_size
+        # movie id -> (time of the first call, future shared by the calls) of the batch
+        # being gathered.
+        self._pending: typing.Dict[str, typing.Tuple[float, asyncio.Future]] = {}
+        self._flush_handle: typing.Optional[asyncio.Handle] = None
+        # The event loop only keeps weak references to the tasks.
+        self._loads: typing.Set[asyncio.Future] = set()
+
+    async def get_by_id(
+        self, movie_id: str, fields: typing.Optional[typing.Sequence[str]] = None
+    ) -> typing.Optional[Movie]:
+        if fields is not None:
+            # get_many reads whole movies, partial reads go straight to the repository.
+            return await self._repository.get_by_id(movie_id, fields=fields)
+        entry = self._pending.get(movie_id)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            entry = (time.perf_counter(), loop.create_future())
+            self._pending[movie_id] = entry
+            if len(self._pending) >= self._max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                if self._window > 0:
+                    self._flush_handle = loop.call_later(self._window, self._flush)
+                else:
+                    self._flush_handle = loop.call_soon(self._flush)
+        # A cancelled caller must not cancel the future shared with the other callers.
+        return await asyncio.shield(entry[1])
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        now = time.perf_counter()
+        MOVIE_BATCH_SIZE.observe(len(batch))
+        for started_at, _ in batch.values():
+            MOVIE_BATCH_WAIT.observe(now - started_at)
+        load = asyncio.ensure_future(self._load(batch))
+        self._loads.add(load)
+        load.add_done_callback(self._loads.discard)
+
+    async def _load(self, batch: typing.Dict[str, typing.Tuple[float, asyncio.Future]]):
+        movie_ids = list(batch)
+        try:
+            movies = await self._repository.get_many(movie_ids)
+        except asyncio.CancelledError:
+            for _, future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for movie_id, movie in zip(movie_ids, movies):
+            future = batch[movie_id][1]
+            if not future.done():
+                future.set_result(movie)
@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import time
+import typing
+from collections import OrderedDict
+
+from api.entities.movie import Movie
+from api.metrics import MOVIE_CACHE_EVICTIONS, MOVIE_CACHE_HITS, MOVIE_CACHE_MISSES
+from api.repository.movie.abstractions import (
+    DelegatingMovieRepository,
+    MovieRepository,
+)
+
+
+class CachingMovieRepository(DelegatingMovieRepository):
+    """
+    CachingMovieRepository wraps another MovieRepository and serves get_by_id from a bounded
+    in process cache. Entries are evicted in least recently used order once the cache is full
+    and expire after a time to live. Writes going through the repository invalidate the
+    affected entries.
+    """
+
+    def __init__(
+        self,
+        repository: MovieRepository,
+        max_size: int = 10_000,
+        ttl: float = 30.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        """
+        Parameters
+        ----------
+        repository: MovieRepository
+            The repository to read through and write to.
+        max_size: int
+            The maximum number of movies held by the cache.
+        ttl: float
+            The number of seconds a movie is served from the cache.
+        clock: Callable
+            Returns the current time in seconds, used for the entries expiration.
+        """
+        super().__init__(repository)
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        # movie id -> (expiration time, movie), ordered from least to most recently used.
+        self._entries: "OrderedDict[str, typing.Tuple[float, Movie]]" = OrderedDict()
+        # movie id -> backend call in flight, shared by all the concurrent misses of an id.
+        self._loading: typing.Dict[str, asyncio.Future] = {}
+        # Incremented on every invalidation, used to detect writes racing a get_many.
+        self._invalidations = 0
+
+    def _lookup(self, movie_id: str) -> typing.Optional[Movie]:
+        entry = self._entries.get(movie_id)
+        if entry is None:
+            MOVIE_CACHE_MISSES.inc()
+            return None
+        expires_at, movie = entry
+        if expires_at <= self._clock():
+            del self._entries[movie_id]
+            MOVIE_CACHE_EVICTIONS.labels(reason="expired").inc()
+            MOVIE_CACHE_MISSES.inc()
+            return None
+        self._entries.move_to_end(movie_id)
+        MOVIE_CACHE_HITS.inc()
+        return movie
+
+    def _store(self, movie: Movie):
+        self._entries[movie.id] = (self._clock() + self._ttl, movie)
+        self._entries.move_to_end(movie.id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            MOVIE_CACHE_EVICTIONS.labels(reason="size").inc()
+
+    def _invalidate(self, movie_id: str):
+        self._invalidations += 1
+        self._entries.pop(movie_id, None)
+        # A load in flight may have read the movie before the write, don't cache its result.
+        self._loading.pop(movie_id, None)
+
+    def _loaded(self, movie_id: str, loading: asyncio.Future):
+        if self._loading.get(movie_id) is not loading:
+            return
+        del self._loading[movie_id]
+        if loading.cancelled() or loading.exception() is not None:
+            return
+        movie = loading.result()
+        if movie is not None:
+            self._store(movie)
+
+    async def create(self, movie: Movie):
+        await self._repository.create(movie)
+        self._invalidate(movie.id)
+
+    async def create_many(
+        self, movies: typing.List[Movie]
+    ) -> typing.List[typing.Optional[str]]:
+        errors = await self._repository.create_many(movies)
+        for movie in movies:
+            self._invalidate(movie.id)
+        return errors
+
+    async def get_by_id(
+        self, movie_id: str, fields: typing.Optional[typing.Sequence[str]] = None
+    ) -> typing.Optional[Movie]:
+        movie = self._lookup(movie_id)
+        if movie is not None:
+            return movie
+        if fields is not None:
+            # A partial movie can't be cached, read it without sharing a full load.
+            return await self._repository.get_by_id(movie_id, fields=fields)
+        loading = self._loading.get(movie_id)
+        if loading is None:
+            # The backend call runs in its own task so a cancelled caller doesn't cancel it
+            # for the other callers waiting on the same id.
+            loading = asyncio.ensure_future(self._repository.get_by_id(movie_id))
+            self._loading[movie_id] = loading
+            loading.add_done_callback(functools.partial(self._loaded, movie_id))
+        return await asyncio.shield(loading)
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        found: typing.Dict[str, Movie] = {}
+        missing = []
+        for movie_id in movie_ids:
+            movie = self._lookup(movie_id)
+            if movie is None:
+                missing.append(movie_id)
+            else:
+                found[movie_id] = movie
+        if missing:
+            invalidations = self._invalidations
+            movies = await self._repository.get_many(missing)
+            for movie in movies:
+                if movie is None:
+                    continue
+                found[movie.id] = movie
+                if invalidations == self._invalidations:
+                    self._store(movie)
+        return [found.get(movie_id) for movie_id in movie_ids]
+
+    async def update(self, movie_id: str, update_parameters: dict) -> Movie:
+        try:
+            movie = await self._repository.update(movie_id, update_parameters)
+        finally:
+            self._invalidate(movie_id)
+        # The updated movie is as fresh as a read.
+        self._store(movie)
+        return movie
+
+    async def delete(self, movie_id: str) -> typing.Optional[Movie]:
+        movie = await self._repository.delete(movie_id)
+        self._invalidate(movie_id)
+        return movie
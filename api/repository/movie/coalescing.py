@@ -0,0 +1,105 @@
+import asyncio
+import time
+import typing
+
+from api.entities.movie import Movie
+from api.metrics import MOVIE_CREATE_BATCH_SIZE, MOVIE_CREATE_BATCH_WAIT
+from api.repository.movie.abstractions import (
+    DelegatingMovieRepository,
+    MovieRepository,
+    RepositoryException,
+)
+
+
+class CoalescingMovieRepository(DelegatingMovieRepository):
+    """
+    CoalescingMovieRepository wraps another MovieRepository and gathers the create calls made
+    within a short window into a single create_many call. Every caller waits for the batch
+    and gets the outcome of its own movie.
+    """
+
+    def __init__(
+        self,
+        repository: MovieRepository,
+        window: float = 0.005,
+        max_batch_size: int = 500,
+    ):
+        """
+        Parameters
+        ----------
+        repository: MovieRepository
+            The repository to read through and write to.
+        window: float
+            The number of seconds a batch waits for more creates after its first one. With 0
+            the batch holds the creates made within the current event loop iteration.
+        max_batch_size: int
+            The maximum number of movies of a batch, a full batch is sent right away.
+        """
+        super().__init__(repository)
+        self._window = window
+        self._max_batch_size = max_batch_size
+        # movie id -> (time of the call, movie, future of the call) of the batch being
+        # gathered.
+        self._pending: typing.Dict[str, typing.Tuple[float, Movie, asyncio.Future]] = {}
+        self._flush_handle: typing.Optional[asyncio.Handle] = None
+        # The event loop only keeps weak references to the tasks.
+        self._writes: typing.Set[asyncio.Future] = set()
+
+    async def create(self, movie: Movie):
+        if movie.id in self._pending:
+            # The writes of a batch are unordered, a second create of the same movie goes
+            # to the next batch so the last one still wins.
+            self._flush()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[movie.id] = (time.perf_counter(), movie, future)
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            if self._window > 0:
+                self._flush_handle = loop.call_later(self._window, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+        # A cancelled caller doesn't cancel the write of the whole batch.
+        await asyncio.shield(future)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        now = time.perf_counter()
+        MOVIE_CREATE_BATCH_SIZE.observe(len(batch))
+        for started_at, _, _ in batch.values():
+            MOVIE_CREATE_BATCH_WAIT.observe(now - started_at)
+        write = asyncio.ensure_future(self._write(list(batch.values())))
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+
+    async def _write(
+        self, batch: typing.List[typing.Tuple[float, Movie, asyncio.Future]]
+    ):
+        try:
+            errors = await self._repository.create_many(
+                [movie for _, movie, _ in batch]
+            )
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, movie, future), error in zip(batch, errors):
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(
+                    RepositoryException(f"movie: {movie.id} not created: {error}")
+                )
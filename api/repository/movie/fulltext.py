@@ -0,0 +1,180 @@
+"""
+    Full text search of movie descriptions, ranked with Okapi BM25.
+"""
+import heapq
+import math
+import re
+import sys
+import typing
+from array import array
+
+_WORD = re.compile(r"\w+")
+
+# The slots are stored in the upper 24 bits of the postings.
+MAX_SLOT = (1 << 24) - 1
+
+# Words too common to tell descriptions apart, left out of the index.
+STOP_WORDS = frozenset(
+    (
+        "a an and are as at be but by for from has have he her his in into is it its of on "
+        "or she so than that the their them then there they this to was were which who "
+        "will with"
+    ).split()
+)
+
+
+def tokenize(text: str) -> typing.List[str]:
+    """
+    Returns the folded words of the text, without the stop words.
+    """
+    return [word for word in _WORD.findall(text.casefold()) if word not in STOP_WORDS]
+
+
+class FullTextIndex:
+    """
+    FullTextIndex is an inverted index from the words of the movie descriptions to the
+    movies, scored with BM25.
+
+    Every movie is given a slot. The postings of a word are a single array of 4 bytes per
+    movie holding the word: the slot of the movie in the upper 24 bits and the number of
+    times the word appears in its text in the lower 8 bits, saturating at 255 since BM25
+    barely tells the difference past a few occurrences. Removing a movie leaves a tombstone
+    behind, the postings are compacted once the tombstones outnumber the movies.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Parameters
+        ----------
+        k1: float
+            How fast the score of a word saturates with its number of occurrences.
+        b: float
+            How much the length of a description lowers its scores, from 0 to 1.
+        """
+        self._k1 = k1
+        self._b = b
+        self._postings: typing.Dict[str, array] = {}
+        self._slots: typing.Dict[str, int] = {}
+        # By slot, None for the tombstones.
+        self._ids: typing.List[typing.Optional[str]] = []
+        self._lengths = array("I")
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, movie_id: str, text: str):
+        """
+        Indexes the text of a movie, replacing its previous text.
+        """
+        self.remove(movie_id)
+        words = tokenize(text)
+        frequencies: typing.Dict[str, int] = {}
+        for word in words:
+            frequencies[word] = frequencies.get(word, 0) + 1
+        slot = len(self._ids)
+        if slot > MAX_SLOT:
+            self._compact()
+            slot = len(self._ids)
+        self._slots[movie_id] = slot
+        self._ids.append(movie_id)
+        self._lengths.append(len(words))
+        self._total_length += len(words)
+        for word, frequency in frequencies.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = array("I")
+            postings.append(slot << 8 | min(frequency, 255))
+
+    def remove(self, movie_id: str):
+        """
+        Removes a movie from the index, if it is indexed.
+        """
+        slot = self._slots.pop(movie_id, None)
+        if slot is None:
+            return
+        self._ids[slot] = None
+        self._total_length -= self._lengths[slot]
+        tombstones = len(self._ids) - len(self._slots)
+        if tombstones > 1024 and tombstones > len(self._slots):
+            self._compact()
+
+    def _compact(self):
+        # Renumbers the live slots in order, so the postings stay sorted by slot.
+        renumbered = array("i", [-1]) * len(self._ids)
+        ids = []
+        lengths = array("I")
+        for slot, movie_id in enumerate(self._ids):
+            if movie_id is not None:
+                renumbered[slot] = len(ids)
+                self._slots[movie_id] = len(ids)
+                ids.append(movie_id)
+                lengths.append(self._lengths[slot])
+        postings = {}
+        for word, packed in self._postings.items():
+            live = array(
+                "I",
+                (
+                    renumbered[posting >> 8] << 8 | posting & 255
+                    for posting in packed
+                    if renumbered[posting >> 8] >= 0
+                ),
+            )
+            if live:
+                postings[word] = live
+        self._postings = postings
+        self._ids = ids
+        self._lengths = lengths
+
+    def nbytes(self) -> int:
+        """
+        Returns the approximate memory used by the index, in bytes.
+        """
+        size = sys.getsizeof(self._postings) + sys.getsizeof(self._slots)
+        size += sys.getsizeof(self._ids) + sys.getsizeof(self._lengths)
+        for word, postings in self._postings.items():
+            size += sys.getsizeof(word) + sys.getsizeof(postings)
+        return size
+
+    def search(
+        self, query: str, limit: int = 10
+    ) -> typing.List[typing.Tuple[str, float]]:
+        """
+        Returns the ids and BM25 scores of the limit movies best matching the query, best
+        first. Only the movies holding at least one word of the query are returned.
+        """
+        movies = len(self._slots)
+        if not movies:
+            return []
+        average_length = self._total_length / movies
+        ids = self._ids
+        lengths = self._lengths
+        k1 = self._k1
+        # The part of the BM25 denominator which depends on the length of the description.
+        norms: typing.Dict[int, float] = {}
+        scores: typing.Dict[int, float] = {}
+        for word in set(tokenize(query)):
+            postings = self._postings.get(word)
+            if postings is None:
+                continue
+            live = [
+                (posting >> 8, posting & 255)
+                for posting in postings
+                if ids[posting >> 8] is not None
+            ]
+            if not live:
+                continue
+            idf = math.log(1 + (movies - len(live) + 0.5) / (len(live) + 0.5))
+            for slot, frequency in live:
+                norm = norms.get(slot)
+                if norm is None:
+                    norm = norms[slot] = k1 * (
+                        1 - self._b + self._b * lengths[slot] / average_length
+                    )
+                scores[slot] = scores.get(slot, 0.0) + idf * frequency * (k1 + 1) / (
+                    frequency + norm
+                )
+        best = heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (-item[1], ids[item[0]])
+        )
+        return [(ids[slot], score) for slot, score in best]
@@ -0,0 +1,218 @@
+import time
+import typing
+
+from api.entities.movie import Movie
+from api.metrics import (
+    MOVIE_REPOSITORY_ERRORS,
+    MOVIE_REPOSITORY_LATENCY,
+    MOVIE_REPOSITORY_RESULTS,
+)
+from api.repository.movie.abstractions import (
+    DelegatingMovieRepository,
+    TITLE_EXACT,
+    MovieRepository,
+    ScoredMovie,
+)
+
+# The MovieRepository methods recorded by InstrumentedMovieRepository.
+OPERATIONS = (
+    "create",
+    "create_many",
+    "get_by_id",
+    "get_many",
+    "get_by_title",
+    "iter_by_title",
+    "iter_all",
+    "get_by_fuzzy_title",
+    "search_by_description",
+    "update",
+    "delete",
+)
+
+
+class _OperationMetrics:
+    """
+    The metrics of one operation, with their labels resolved once.
+    """
+
+    __slots__ = ("latency", "results", "errors")
+
+    def __init__(self, backend: str, operation: str):
+        self.latency = MOVIE_REPOSITORY_LATENCY.labels(backend, operation)
+        self.results = MOVIE_REPOSITORY_RESULTS.labels(backend, operation)
+        self.errors = MOVIE_REPOSITORY_ERRORS.labels(backend, operation)
+
+
+class InstrumentedMovieRepository(DelegatingMovieRepository):
+    """
+    InstrumentedMovieRepository wraps another MovieRepository and records the latency, the
+    number of movies read or written and the errors of every call, labelled by backend and
+    operation.
+    """
+
+    def __init__(self, repository: MovieRepository, backend: str):
+        """
+        Parameters
+        ----------
+        repository: MovieRepository
+            The repository to record the calls of.
+        backend: str
+            The backend label of the metrics, for example mongo.
+        """
+        super().__init__(repository)
+        self._metrics = {
+            operation: _OperationMetrics(backend, operation) for operation in OPERATIONS
+        }
+
+    async def _record(
+        self,
+        operation: str,
+        call: typing.Awaitable,
+        count: typing.Optional[typing.Callable[[typing.Any], int]] = None,
+    ):
+        metrics = self._metrics[operation]
+        start = time.perf_counter()
+        try:
+            result = await call
+        except Exception:
+            metrics.errors.inc()
+            raise
+        finally:
+            metrics.latency.observe(time.perf_counter() - start)
+        if count is not None:
+            metrics.results.observe(count(result))
+        return result
+
+    async def create(self, movie: Movie):
+        return await self._record("create", self._repository.create(movie))
+
+    async def create_many(
+        self, movies: typing.List[Movie]
+    ) -> typing.List[typing.Optional[str]]:
+        return await self._record(
+            "create_many",
+            self._repository.create_many(movies),
+            lambda errors: errors.count(None),
+        )
+
+    async def get_by_id(
+        self, movie_id: str, fields: typing.Optional[typing.Sequence[str]] = None
+    ) -> typing.Optional[Movie]:
+        # A single movie, the latency histogram is enough; each observation costs ~2us.
+        return await self._record(
+            "get_by_id", self._repository.get_by_id(movie_id, fields=fields)
+        )
+
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        return await self._record(
+            "get_many",
+            self._repository.get_many(movie_ids),
+            lambda movies: len(movies) - movies.count(None),
+        )
+
+    async def get_by_title(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
+    ) -> typing.List[Movie]:
+        return await self._record(
+            "get_by_title",
+            self._repository.get_by_title(
+                title,
+                skip=skip,
+                limit=limit,
+                after=after,
+                fields=fields,
+                match=match,
+                after_title=after_title,
+            ),
+            len,
+        )
+
+    async def iter_by_title(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        # Recorded from the first read until the iterator is exhausted or closed.
+        metrics = self._metrics["iter_by_title"]
+        count = 0
+        start = time.perf_counter()
+        try:
+            async for movie in self._repository.iter_by_title(
+                title,
+                skip=skip,
+                limit=limit,
+                after=after,
+                fields=fields,
+                match=match,
+                after_title=after_title,
+            ):
+                count += 1
+                yield movie
+        except Exception:
+            metrics.errors.inc()
+            raise
+        finally:
+            metrics.latency.observe(time.perf_counter() - start)
+            metrics.results.observe(count)
+
+    async def iter_all(
+        self,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        # Recorded like iter_by_title.
+        metrics = self._metrics["iter_all"]
+        count = 0
+        start = time.perf_counter()
+        try:
+            async for movie in self._repository.iter_all(after=after, fields=fields):
+                count += 1
+                yield movie
+        except Exception:
+            metrics.errors.inc()
+            raise
+        finally:
+            metrics.latency.observe(time.perf_counter() - start)
+            metrics.results.observe(count)
+
+    async def get_by_fuzzy_title(
+        self, title: str, limit: int = 10, threshold: float = 0.3
+    ) -> typing.List[ScoredMovie]:
+        return await self._record(
+            "get_by_fuzzy_title",
+            self._repository.get_by_fuzzy_title(
+                title, limit=limit, threshold=threshold
+            ),
+            len,
+        )
+
+    async def search_by_description(
+        self, query: str, limit: int = 10
+    ) -> typing.List[ScoredMovie]:
+        return await self._record(
+            "search_by_description",
+            self._repository.search_by_description(query, limit=limit),
+            len,
+        )
+
+    async def update(self, movie_id: str, update_parameters: dict) -> Movie:
+        return await self._record(
+            "update", self._repository.update(movie_id, update_parameters)
+        )
+
+    async def delete(self, movie_id: str) -> typing.Optional[Movie]:
+        return await self._record("delete", self._repository.delete(movie_id))
@@ -1,7 +1,24 @@
+import bisect
 import typing
 
 from api.entities.movie import Movie
-from api.repository.movie.abstractions import MovieRepository, RepositoryException
+from api.repository.movie.abstractions import (
+    TITLE_EXACT,
+    TITLE_INSENSITIVE,
+    TITLE_PREFIX,
+    MovieRepository,
+    RepositoryException,
+    ScoredMovie,
+    fold_title,
+)
+from api.repository.movie.fulltext import FullTextIndex
+from api.repository.movie.trigrams import TrigramIndex
+
+# Above this many changes, create_many rebuilds the folded title index in one sort instead
+# of inserting into it one movie at a time.
+FOLDED_INDEX_REBUILD_THRESHOLD = 64
+# Greater than any folded title starting with a given prefix.
+_PREFIX_END = "\U0010ffff"
 
 
 class MemoryMovieRepository(MovieRepository):
@@ -11,35 +28,240 @@ class MemoryMovieRepository(MovieRepository):
 
     def __init__(self):
         self._storage = {}
+        # Secondary index: title -> sorted movie ids, so a page is found by bisection.
+        self._title_index: typing.Dict[str, typing.List[str]] = {}
+        # Sorted (folded title, movie id) pairs, for the case insensitive and prefix matches.
+        self._folded_index: typing.List[typing.Tuple[str, str]] = []
+        # Trigrams of the titles, for the fuzzy title search.
+        self._trigram_index = TrigramIndex()
+        # Words of the descriptions, for the full text search.
+        self._description_index = FullTextIndex()
+
+    def _index_add(self, movie: Movie, folded: bool = True):
+        movie_ids = self._title_index.setdefault(movie.title, [])
+        position = bisect.bisect_left(movie_ids, movie.id)
+        if position == len(movie_ids) or movie_ids[position] != movie.id:
+            movie_ids.insert(position, movie.id)
+        if folded:
+            key = (fold_title(movie.title), movie.id)
+            position = bisect.bisect_left(self._folded_index, key)
+            if (
+                position == len(self._folded_index)
+                or self._folded_index[position] != key
+            ):
+                self._folded_index.insert(position, key)
+
+    def _index_remove(self, movie: Movie, folded: bool = True):
+        movie_ids = self._title_index.get(movie.title)
+        if movie_ids is None:
+            return
+        position = bisect.bisect_left(movie_ids, movie.id)
+        if position < len(movie_ids) and movie_ids[position] == movie.id:
+            del movie_ids[position]
+        if not movie_ids:
+            del self._title_index[movie.title]
+        if folded:
+            key = (fold_title(movie.title), movie.id)
+            position = bisect.bisect_left(self._folded_index, key)
+            if (
+                position < len(self._folded_index)
+                and self._folded_index[position] == key
+            ):
+                del self._folded_index[position]
 
     async def create(self, movie: Movie):
+        existing = self._storage.get(movie.id)
+        movie = movie.with_version(1 if existing is None else existing.version + 1)
+        if existing is not None and existing.title != movie.title:
+            self._index_remove(existing)
         self._storage[movie.id] = movie
+        self._index_add(movie)
+        self._trigram_index.add(movie.id, movie.title)
+        if existing is None or existing.description != movie.description:
+            self._description_index.add(movie.id, movie.description)
+
+    async def create_many(
+        self, movies: typing.List[Movie]
+    ) -> typing.List[typing.Optional[str]]:
+        # The last movie wins when the same id appears more than once.
+        batch = {movie.id: movie for movie in movies}
+        removed = []
+        added = []
+        for movie in batch.values():
+            existing = self._storage.get(movie.id)
+            movie = batch[movie.id] = movie.with_version(
+                1 if existing is None else existing.version + 1
+            )
+            if existing is None or existing.description != movie.description:
+                self._description_index.add(movie.id, movie.description)
+            if existing is None:
+                added.append(movie)
+            elif existing.title != movie.title:
+                removed.append(existing)
+                added.append(movie)
+        # Inserting one by one shifts the whole folded index every time, a large batch is
+        # merged into it with a single sort instead.
+        rebuild = len(removed) + len(added) > FOLDED_INDEX_REBUILD_THRESHOLD
+        for movie in removed:
+            self._index_remove(movie, folded=not rebuild)
+        self._storage.update(batch)
+        for movie in added:
+            self._index_add(movie, folded=not rebuild)
+        if rebuild:
+            stale = {(fold_title(movie.title), movie.id) for movie in removed}
+            if stale:
+                self._folded_index = [
+                    key for key in self._folded_index if key not in stale
+                ]
+            self._folded_index.extend(
+                (fold_title(movie.title), movie.id) for movie in added
+            )
+            self._folded_index.sort()
+        for movie in added:
+            self._trigram_index.add(movie.id, movie.title)
+        return [None] * len(movies)
 
-    async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
+    async def get_by_id(
+        self, movie_id: str, fields: typing.Optional[typing.Sequence[str]] = None
+    ) -> typing.Optional[Movie]:
         return self._storage.get(movie_id)
 
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        return [self._storage.get(movie_id) for movie_id in movie_ids]
+
     async def get_by_title(
-        self, title: str, skip: int = 0, limit: int = 1000
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
     ) -> typing.List[Movie]:
-        return_value = []
-        for _, value in self._storage.items():
-            if title == value.title:
-                return_value.append(value)
-        if limit == 0:
-            return return_value[skip:]
-        return return_value[skip : skip + limit]
-
-    async def update(self, movie_id: str, update_parameters: dict):
+        return [
+            self._storage[movie_id]
+            for movie_id in self._page(title, skip, limit, after, match, after_title)
+        ]
+
+    async def iter_by_title(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        for movie_id in self._page(title, skip, limit, after, match, after_title):
+            # Deleted while iterating.
+            movie = self._storage.get(movie_id)
+            if movie is not None:
+                yield movie
+
+    def _page(
+        self,
+        title: str,
+        skip: int,
+        limit: int,
+        after: typing.Optional[str],
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
+    ) -> typing.List[str]:
+        if match == TITLE_EXACT:
+            movie_ids = self._title_index.get(title)
+            if not movie_ids:
+                return []
+            start = skip
+            if after is not None:
+                start += bisect.bisect_right(movie_ids, after)
+            stop = None if limit == 0 else start + limit
+            return movie_ids[start:stop]
+
+        folded = fold_title(title)
+        if match == TITLE_INSENSITIVE:
+            # The pairs of the folded title sort before (folded + "\0",).
+            end = (folded + "\0",)
+            if after is not None:
+                after_title = folded
+        elif match == TITLE_PREFIX:
+            end = (folded + _PREFIX_END,)
+        else:
+            raise RepositoryException(f"unknown title match: {match}")
+        index = self._folded_index
+        start = bisect.bisect_left(index, (folded,))
+        if after is not None:
+            start = max(
+                start, bisect.bisect_right(index, (after_title or folded, after))
+            )
+        start += skip
+        stop = bisect.bisect_left(index, end, lo=min(start, len(index)))
+        if limit != 0:
+            stop = min(stop, start + limit)
+        return [movie_id for _, movie_id in index[start:stop]]
+
+    async def iter_all(
+        self,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        movie_ids = sorted(self._storage)
+        start = 0 if after is None else bisect.bisect_right(movie_ids, after)
+        for movie_id in movie_ids[start:]:
+            # Deleted while iterating.
+            movie = self._storage.get(movie_id)
+            if movie is not None:
+                yield movie
+
+    async def get_by_fuzzy_title(
+        self, title: str, limit: int = 10, threshold: float = 0.3
+    ) -> typing.List[ScoredMovie]:
+        return [
+            ScoredMovie(movie=self._storage[movie_id], score=score)
+            for movie_id, score in self._trigram_index.search(
+                title, limit=limit, threshold=threshold
+            )
+        ]
+
+    async def search_by_description(
+        self, query: str, limit: int = 10
+    ) -> typing.List[ScoredMovie]:
+        return [
+            ScoredMovie(movie=self._storage[movie_id], score=score)
+            for movie_id, score in self._description_index.search(query, limit=limit)
+        ]
+
+    async def update(self, movie_id: str, update_parameters: dict) -> Movie:
         movie = self._storage.get(movie_id)
         if movie is None:
             raise RepositoryException(f"movie: {movie_id} not found")
-        for key, value in update_parameters.items():
-            if key == "id":
-                raise RepositoryException(f"can't update movie id.")
-            # Check that update_parameters are fields from Movie entity.
-            if hasattr(movie, key):
-                # Update the Movie entity field.
-                setattr(movie, f"_{key}", value)
-
-    async def delete(self, movie_id: str):
-        self._storage.pop(movie_id, None)
+        if "id" in update_parameters:
+            raise RepositoryException(f"can't update movie id.")
+        # Keys which are not fields from Movie entity are ignored.
+        updated_movie = movie.replace(
+            **{
+                key: value
+                for key, value in update_parameters.items()
+                if key in Movie.FIELDS
+            }
+        ).with_version(movie.version + 1)
+        # A title change moves the movie to another bucket of the title index.
+        if updated_movie.title != movie.title:
+            self._index_remove(movie)
+            self._index_add(updated_movie)
+            self._trigram_index.add(movie_id, updated_movie.title)
+        if updated_movie.description != movie.description:
+            self._description_index.add(movie_id, updated_movie.description)
+        self._storage[movie_id] = updated_movie
+        return updated_movie
+
+    async def delete(self, movie_id: str) -> typing.Optional[Movie]:
+        movie = self._storage.pop(movie_id, None)
+        if movie is not None:
+            self._index_remove(movie)
+            self._trigram_index.remove(movie_id)
+            self._description_index.remove(movie_id)
+        return movie
@@ -1,9 +1,46 @@
+import asyncio
 import typing
+from collections import OrderedDict, namedtuple
 
 import motor.motor_asyncio
+from pymongo import ASCENDING, TEXT, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
 from api.entities.movie import Movie
-from api.repository.movie.abstractions import MovieRepository, RepositoryException
+from api.repository.movie.abstractions import (
+    TITLE_EXACT,
+    TITLE_INSENSITIVE,
+    TITLE_PREFIX,
+    MovieRepository,
+    RepositoryException,
+    ScoredMovie,
+    fold_title,
+)
+from api.repository.movie.trigrams import required_overlap, title_trigrams
+
+# Indexes the movies collection is expected to have. Every query issued by
+# MongoMovieRepository must be served by one of them.
+MOVIE_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_1", unique=True),
+    IndexModel([("title", ASCENDING), ("id", ASCENDING)], name="title_1_id_1"),
+    IndexModel(
+        [("title_folded", ASCENDING), ("id", ASCENDING)], name="title_folded_1_id_1"
+    ),
+    IndexModel([("title_trigrams", ASCENDING)], name="title_trigrams_1"),
+    IndexModel(
+        [("description", TEXT)], name="description_text", default_language="english"
+    ),
+]
+
+# The maximum number of movies scored by a fuzzy title search.
+FUZZY_MAX_CANDIDATES = 20_000
+# The maximum number of trigrams with a cached number of titles.
+TRIGRAM_COUNTS_CACHE_SIZE = 100_000
+
+# Greater than any folded title starting with a given prefix.
+_PREFIX_END = "\U0010ffff"
+
+IndexReport = namedtuple("IndexReport", ["missing", "unexpected"])
 
 
 class MongoMovieRepository(MovieRepository):
@@ -15,66 +52,456 @@ class MongoMovieRepository(MovieRepository):
         self,
         connection_string: str = "mongodb://localhost:27017",
         database: str = "movie_track_db",
+        cursor_batch_size: int = 200,
+        export_batch_size: int = 5000,
+        **client_options,
     ):
-        self._client = motor.motor_asyncio.AsyncIOMotorClient(connection_string)
+        """
+        Parameters
+        ----------
+        connection_string: str
+            The MongoDB connection string.
+        database: str
+            The name of the database holding the movies collection.
+        cursor_batch_size: int
+            The number of documents fetched per round trip when iterating a cursor.
+        export_batch_size: int
+            The number of documents fetched per round trip when iterating every movie.
+        **client_options
+            Options passed to the Motor client, for example maxPoolSize or compressors.
+        """
+        self._cursor_batch_size = cursor_batch_size
+        self._export_batch_size = export_batch_size
+        self._client = motor.motor_asyncio.AsyncIOMotorClient(
+            connection_string, **client_options
+        )
         self._database = self._client[database]
         # Movie collection which holds our movie documents.
         self._movies = self._database["movies"]
+        # trigram -> number of titles holding it, ordered from least to most recently used.
+        self._trigram_counts_cache: "OrderedDict[str, int]" = OrderedDict()
+
+    @property
+    def min_pool_size(self) -> int:
+        """
+        The number of connections the client keeps open, from its options or its connection
+        string.
+        """
+        return self._client.options.pool_options.min_pool_size
+
+    async def connect(self, connections: int = 1):
+        """
+        Opens connections to MongoDB up front, so the first requests don't pay for them.
+
+        Every concurrent ping checks out its own connection from the pool.
+        """
+        await asyncio.gather(
+            *[self._client.admin.command("ping") for _ in range(max(connections, 1))]
+        )
+
+    def close(self):
+        """
+        Closes the connections of the Motor client.
+        """
+        self._client.close()
+
+    async def ensure_indexes(self):
+        """
+        Creates the indexes declared in MOVIE_INDEXES, indexes that already exist are left untouched.
+        """
+        await self._movies.create_indexes(MOVIE_INDEXES)
+
+    async def check_indexes(self) -> IndexReport:
+        """
+        Compares the indexes of the movies collection against MOVIE_INDEXES.
+
+        Returns the names of the declared indexes which are missing (or differ from their
+        declaration) and the names of the existing indexes which are not declared.
+        """
+        existing = await self._movies.index_information()
+        # The _id index is created by MongoDB itself.
+        existing.pop("_id_", None)
+        missing = []
+        for index in MOVIE_INDEXES:
+            document = index.document
+            info = existing.pop(document["name"], None)
+            if info is None or not self._index_matches(info, document):
+                missing.append(document["name"])
+        return IndexReport(missing=missing, unexpected=sorted(existing.keys()))
+
+    @staticmethod
+    def _index_matches(info: dict, document: dict) -> bool:
+        if info.get("unique", False) != document.get("unique", False):
+            return False
+        key = list(document["key"].items())
+        text_fields = [field for field, kind in key if kind == TEXT]
+        if text_fields:
+            # MongoDB reports the key of a text index as _fts and _ftsx, the indexed
+            # fields are the ones weighted.
+            return sorted(info.get("weights", {})) == sorted(text_fields)
+        return list(info["key"]) == key
+
+    async def backfill_title_keys(self, batch_size: int = 1000) -> int:
+        """
+        Sets the folded title and the title trigrams of the movies written before they were
+        stored.
+
+        Returns the number of movies updated.
+        """
+        updated = 0
+        operations = []
+        # Null queries on title_folded and title_trigrams are served by their indexes.
+        async for document in self._movies.find(
+            {"$or": [{"title_folded": None}, {"title_trigrams": None}]},
+            {"_id": False, "id": True, "title": True},
+        ).batch_size(batch_size):
+            operations.append(
+                UpdateOne(
+                    {"id": document["id"]},
+                    {"$set": self._title_keys(document.get("title") or "")},
+                )
+            )
+            if len(operations) == batch_size:
+                await self._movies.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            await self._movies.bulk_write(operations, ordered=False)
+            updated += len(operations)
+        return updated
+
+    @staticmethod
+    def _title_keys(title: str) -> dict:
+        # Matched by the case insensitive and prefix title queries, and the fuzzy title search.
+        return {
+            "title_folded": fold_title(title),
+            "title_trigrams": sorted(title_trigrams(title)),
+        }
+
+    @staticmethod
+    def _movie_document(movie: Movie) -> dict:
+        return {
+            "id": movie.id,
+            "title": movie.title,
+            "description": movie.description,
+            "release_year": movie.release_year,
+            "watched": movie.watched,
+            **MongoMovieRepository._title_keys(movie.title),
+        }
+
+    @staticmethod
+    def _projection(fields: typing.Optional[typing.Sequence[str]] = None) -> dict:
+        # The _id field is never used, leaving it out lets queries on title_1_id_1 be covered
+        # by the index when only the title is requested.
+        projection = {"_id": False}
+        if fields is None:
+            projection["title_folded"] = False
+            projection["title_trigrams"] = False
+        else:
+            projection["id"] = True
+            projection.update({field: True for field in fields})
+        return projection
+
+    @staticmethod
+    def _movie_from_document(document: dict) -> Movie:
+        return Movie(
+            movie_id=document.get("id"),
+            title=document.get("title"),
+            description=document.get("description"),
+            release_year=document.get("release_year"),
+            watched=document.get("watched"),
+            # Movies written before versions were stored, or read without it, are at 0.
+            version=document.get("version", 0),
+        )
+
+    @staticmethod
+    def _write(document: dict) -> dict:
+        # Every write bumps the version, an upsert inserting the movie starts it at 1.
+        return {"$set": document, "$inc": {"version": 1}}
 
     async def create(self, movie: Movie):
         await self._movies.update_one(
             {"id": movie.id},
-            {
-                "$set": {
-                    "id": movie.id,
-                    "title": movie.title,
-                    "description": movie.description,
-                    "release_year": movie.release_year,
-                    "watched": movie.watched,
-                }
-            },
+            self._write(self._movie_document(movie)),
             upsert=True,
         )
 
-    async def get_by_id(self, movie_id: str) -> typing.Optional[Movie]:
-        document = await self._movies.find_one({"id": movie_id})
-        if document:
-            return Movie(
-                movie_id=document.get("id"),
-                title=document.get("title"),
-                description=document.get("description"),
-                release_year=document.get("release_year"),
-                watched=document.get("watched"),
+    async def create_many(
+        self, movies: typing.List[Movie]
+    ) -> typing.List[typing.Optional[str]]:
+        errors: typing.List[typing.Optional[str]] = [None] * len(movies)
+        if not movies:
+            return errors
+        operations = [
+            UpdateOne(
+                {"id": movie.id}, self._write(self._movie_document(movie)), upsert=True
             )
+            for movie in movies
+        ]
+        try:
+            # Unordered so a failing movie doesn't stop the rest of the batch.
+            await self._movies.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                errors[error["index"]] = error.get("errmsg", "write error")
+        return errors
+
+    async def get_by_id(
+        self, movie_id: str, fields: typing.Optional[typing.Sequence[str]] = None
+    ) -> typing.Optional[Movie]:
+        document = await self._movies.find_one(
+            {"id": movie_id}, self._projection(fields)
+        )
+        if document:
+            return self._movie_from_document(document)
         return None
 
+    async def get_many(
+        self, movie_ids: typing.List[str]
+    ) -> typing.List[typing.Optional[Movie]]:
+        if not movie_ids:
+            return []
+        # A single round trip for all the ids, results are put back in request order.
+        found: typing.Dict[str, Movie] = {}
+        async for document in self._movies.find(
+            {"id": {"$in": list(set(movie_ids))}}, self._projection()
+        ):
+            movie = self._movie_from_document(document)
+            found[movie.id] = movie
+        return [found.get(movie_id) for movie_id in movie_ids]
+
     async def get_by_title(
-        self, title: str, skip: int = 0, limit: int = 1000
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
     ) -> typing.List[Movie]:
-        return_value: typing.List[Movie] = []
-        # Get cursor from db.
-        documents_cursor = self._movies.find({"title": title}).skip(skip).limit(limit)
+        return [
+            movie
+            async for movie in self.iter_by_title(
+                title,
+                skip=skip,
+                limit=limit,
+                after=after,
+                fields=fields,
+                match=match,
+                after_title=after_title,
+            )
+        ]
+
+    async def iter_by_title(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 1000,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        match: str = TITLE_EXACT,
+        after_title: typing.Optional[str] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        if match == TITLE_EXACT:
+            query: dict = {"title": title}
+            if after is not None:
+                query["id"] = {"$gt": after}
+            # The sort is served by the title_1_id_1 index.
+            sort = [("id", ASCENDING)]
+        elif match == TITLE_INSENSITIVE:
+            query = {"title_folded": fold_title(title)}
+            if after is not None:
+                query["id"] = {"$gt": after}
+            # The sort is served by the title_folded_1_id_1 index.
+            sort = [("id", ASCENDING)]
+        elif match == TITLE_PREFIX:
+            # A range on the folded title rather than a regex, so the bounds of the
+            # title_folded_1_id_1 index scan are exact.
+            folded = fold_title(title)
+            query = {"title_folded": {"$gte": folded, "$lt": folded + _PREFIX_END}}
+            if after is not None:
+                after_title = after_title or folded
+                query = {
+                    "$and": [
+                        query,
+                        {
+                            "$or": [
+                                {"title_folded": {"$gt": after_title}},
+                                {"title_folded": after_title, "id": {"$gt": after}},
+                            ]
+                        },
+                    ]
+                }
+            sort = [("title_folded", ASCENDING), ("id", ASCENDING)]
+        else:
+            raise RepositoryException(f"unknown title match: {match}")
+        # Get cursor from db
+        documents_cursor = (
+            self._movies.find(query, self._projection(fields))
+            .sort(sort)
+            .skip(skip)
+            .limit(limit)
+            .batch_size(self._cursor_batch_size)
+        )
         # Iterate though documents
         async for document in documents_cursor:
-            return_value.append(
-                Movie(
-                    movie_id=document.get("id"),
-                    title=document.get("title"),
-                    description=document.get("description"),
-                    release_year=document.get("release_year"),
-                    watched=document.get("watched"),
-                )
+            yield self._movie_from_document(document)
+
+    async def iter_all(
+        self,
+        after: typing.Optional[str] = None,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+    ) -> typing.AsyncIterator[Movie]:
+        query = {} if after is None else {"id": {"$gt": after}}
+        # The sort is served by the id_1 index. Reading the whole collection can outlast the
+        # idle timeout of the cursor, which must then be closed explicitly.
+        documents_cursor = (
+            self._movies.find(query, self._projection(fields), no_cursor_timeout=True)
+            .sort([("id", ASCENDING)])
+            .batch_size(self._export_batch_size)
+        )
+        try:
+            async for document in documents_cursor:
+                yield self._movie_from_document(document)
+        finally:
+            await documents_cursor.close()
+
+    async def _trigram_counts(
+        self, trigrams: typing.List[str]
+    ) -> typing.Dict[str, int]:
+        # The number of titles holding each trigram, counted on the title_trigrams_1 index
+        # up to FUZZY_MAX_CANDIDATES. Only used to read the rarest trigrams first, so the
+        # counts are cached and allowed to drift as the movies change.
+        missing = [
+            trigram for trigram in trigrams if trigram not in self._trigram_counts_cache
+        ]
+        if missing:
+            counts = await asyncio.gather(
+                *[
+                    self._movies.count_documents(
+                        {"title_trigrams": trigram}, limit=FUZZY_MAX_CANDIDATES
+                    )
+                    for trigram in missing
+                ]
+            )
+            for trigram, count in zip(missing, counts):
+                self._trigram_counts_cache[trigram] = count
+                self._trigram_counts_cache.move_to_end(trigram)
+            while len(self._trigram_counts_cache) > TRIGRAM_COUNTS_CACHE_SIZE:
+                self._trigram_counts_cache.popitem(last=False)
+        return {trigram: self._trigram_counts_cache[trigram] for trigram in trigrams}
+
+    async def get_by_fuzzy_title(
+        self, title: str, limit: int = 10, threshold: float = 0.3
+    ) -> typing.List[ScoredMovie]:
+        query = sorted(title_trigrams(title))
+        if not query:
+            return []
+        # A similar title holds at least one of any len(query) - required + 1 trigrams of
+        # the query, the rarest ones are looked up in the title_trigrams_1 index.
+        required = required_overlap(len(query), threshold)
+        counts = await self._trigram_counts(query)
+        probes = sorted(query, key=lambda trigram: (counts[trigram], trigram))
+        pipeline = [
+            {
+                "$match": {
+                    "title_trigrams": {"$in": probes[: len(query) - required + 1]}
+                }
+            },
+            {
+                "$addFields": {
+                    "overlap": {
+                        "$size": {"$setIntersection": ["$title_trigrams", query]}
+                    }
+                }
+            },
+            {"$match": {"overlap": {"$gte": required}}},
+            # Like the memory TrigramIndex, only the candidates sharing the most trigrams
+            # with the query are scored. The sort and limit run as a single top-k sort.
+            {"$sort": {"overlap": -1, "id": 1}},
+            {"$limit": FUZZY_MAX_CANDIDATES},
+            {
+                "$addFields": {
+                    "score": {
+                        "$divide": [
+                            "$overlap",
+                            {
+                                "$subtract": [
+                                    {
+                                        "$add": [
+                                            len(query),
+                                            {"$size": "$title_trigrams"},
+                                        ]
+                                    },
+                                    "$overlap",
+                                ]
+                            },
+                        ]
+                    }
+                }
+            },
+            {"$match": {"score": {"$gte": threshold}}},
+            {"$sort": {"score": -1, "id": 1}},
+            {"$limit": limit},
+            {
+                "$project": {
+                    "_id": False,
+                    "title_folded": False,
+                    "title_trigrams": False,
+                }
+            },
+        ]
+        return [
+            ScoredMovie(
+                movie=self._movie_from_document(document), score=document["score"]
             )
-        return return_value
+            async for document in self._movies.aggregate(pipeline, allowDiskUse=True)
+        ]
 
-    async def update(self, movie_id: str, update_parameters: dict):
+    async def search_by_description(
+        self, query: str, limit: int = 10
+    ) -> typing.List[ScoredMovie]:
+        # The description_text index serves the $text query, its textScore is MongoDB's own
+        # relevance rather than BM25.
+        projection = self._projection()
+        projection["score"] = {"$meta": "textScore"}
+        documents_cursor = (
+            self._movies.find({"$text": {"$search": query}}, projection)
+            .sort([("score", {"$meta": "textScore"}), ("id", ASCENDING)])
+            .limit(limit)
+        )
+        return [
+            ScoredMovie(
+                movie=self._movie_from_document(document), score=document["score"]
+            )
+            async for document in documents_cursor
+        ]
+
+    async def update(self, movie_id: str, update_parameters: dict) -> Movie:
         if "id" in update_parameters.keys():
             raise RepositoryException("can't update movie id.")
-        result = await self._movies.update_one(
-            {"id": movie_id}, {"$set": update_parameters}
+        update_parameters = dict(update_parameters)
+        # The version is only ever incremented by the writes.
+        update_parameters.pop("version", None)
+        if "title" in update_parameters:
+            update_parameters.update(self._title_keys(update_parameters["title"]))
+        # Updates and reads back the movie in a single round trip.
+        document = await self._movies.find_one_and_update(
+            {"id": movie_id},
+            self._write(update_parameters),
+            projection=self._projection(),
+            return_document=ReturnDocument.AFTER,
         )
-        if result.modified_count == 0:
-            raise RepositoryException(f"movie: {movie_id} not updated")
+        if document is None:
+            raise RepositoryException(f"movie: {movie_id} not found")
+        return self._movie_from_document(document)
 
-    async def delete(self, movie_id: str):
-        await self._movies.delete_one({"id": movie_id})
+    async def delete(self, movie_id: str) -> typing.Optional[Movie]:
+        # Deletes and reads back the movie in a single round trip.
+        document = await self._movies.find_one_and_delete(
+            {"id": movie_id}, projection=self._projection()
+        )
+        if document is None:
+            return None
+        return self._movie_from_document(document)
@@ -0,0 +1,235 @@
+import itertools
+import time
+import typing
+from collections import OrderedDict
+
+from api.entities.movie import Movie
+from api.metrics import (
+    TITLE_RESULT_CACHE_EVICTIONS,
+    TITLE_RESULT_CACHE_HITS,
+    TITLE_RESULT_CACHE_MISSES,
+)
+from api.repository.movie.abstractions import (
+    DelegatingMovieRepository,
+    MovieRepository,
+    fold_title,
+)
+
+# Approximate memory used by an entry besides its body and headers, in bytes.
+ENTRY_OVERHEAD = 256
+
+# (expiration time, generation of the title, folded title, body, headers, size)
+_Entry = typing.Tuple[float, int, str, bytes, typing.Dict[str, str], int]
+
+
+class TitleResultCache:
+    """
+    TitleResultCache holds the encoded response bodies of the title queries, bounded by their
+    size in bytes and evicted in least recently used order.
+
+    Every folded title has a generation, bumped by the writes of the movies with that title.
+    An entry is stored with the generation of its title read before the query, and is only
+    served while the generation is unchanged, so a write never scans the cached queries.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 5.0,
+        max_generations: int = 100_000,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        """
+        Parameters
+        ----------
+        max_bytes: int
+            The maximum size of the cached bodies and headers, in bytes.
+        ttl: float
+            The number of seconds a body is served from the cache, bounding the staleness
+            left by the writes of other processes.
+        max_generations: int
+            The maximum number of titles with a generation. Past it the generations are
+            dropped, which invalidates the whole cache.
+        clock: Callable
+            Returns the current time in seconds, used for the entries expiration.
+        """
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._max_generations = max_generations
+        self._clock = clock
+        # query key -> entry, ordered from least to most recently used.
+        self._entries: "OrderedDict[typing.Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        # folded title -> generation, the titles not written since the last reset are at
+        # the generation of the reset.
+        self._generations: typing.Dict[str, int] = {}
+        self._counter = itertools.count(1)
+        self._base_generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def generation(self, title: str) -> int:
+        """
+        Returns the current generation of a title, to be given to store.
+        """
+        return self._generations.get(fold_title(title), self._base_generation)
+
+    def bump(self, titles: typing.Iterable[str]):
+        """
+        Invalidates the cached queries of the titles.
+        """
+        for folded in {fold_title(title) for title in titles}:
+            if folded not in self._generations and (
+                len(self._generations) >= self._max_generations
+            ):
+                # The entries of every title hold an older generation than the new base.
+                self._generations.clear()
+                self._base_generation = next(self._counter)
+            self._generations[folded] = next(self._counter)
+
+    def lookup(
+        self, key: typing.Hashable
+    ) -> typing.Optional[typing.Tuple[bytes, typing.Dict[str, str]]]:
+        """
+        Returns the body and headers cached for the query key, None if they are missing,
+        expired or outdated by a write.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            TITLE_RESULT_CACHE_MISSES.inc()
+            return None
+        expires_at, generation, folded, body, headers, size = entry
+        if expires_at <= self._clock():
+            reason = "expired"
+        elif generation != self._generations.get(folded, self._base_generation):
+            reason = "outdated"
+        else:
+            self._entries.move_to_end(key)
+            TITLE_RESULT_CACHE_HITS.inc()
+            return body, headers
+        del self._entries[key]
+        self._bytes -= size
+        TITLE_RESULT_CACHE_EVICTIONS.labels(reason=reason).inc()
+        TITLE_RESULT_CACHE_MISSES.inc()
+        return None
+
+    def store(
+        self,
+        key: typing.Hashable,
+        title: str,
+        generation: int,
+        body: bytes,
+        headers: typing.Dict[str, str],
+    ):
+        """
+        Caches the body and headers of the query key, read while the title was at generation.
+        """
+        folded = fold_title(title)
+        if generation != self._generations.get(folded, self._base_generation):
+            # Written while the query was running, the body may already be outdated.
+            return
+        size = ENTRY_OVERHEAD + len(body)
+        size += sum(len(name) + len(value) for name, value in headers.items())
+        if size > self._max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[5]
+        self._entries[key] = (
+            self._clock() + self._ttl,
+            generation,
+            folded,
+            body,
+            headers,
+            size,
+        )
+        self._bytes += size
+        while self._bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted[5]
+            TITLE_RESULT_CACHE_EVICTIONS.labels(reason="size").inc()
+
+
+class TitleResultInvalidatingMovieRepository(DelegatingMovieRepository):
+    """
+    TitleResultInvalidatingMovieRepository wraps another MovieRepository and bumps the
+    generations of the titles written through it in a TitleResultCache.
+
+    The title a movie had before a write is taken from the movie returned by delete and
+    update. It costs an extra read only for the creates which may replace a movie, and the
+    updates of the title.
+    """
+
+    def __init__(
+        self,
+        repository: MovieRepository,
+        cache: TitleResultCache,
+        overwrites: bool = True,
+    ):
+        """
+        Parameters
+        ----------
+        repository: MovieRepository
+            The repository to read through and write to.
+        cache: TitleResultCache
+            The cache of the title query results to invalidate.
+        overwrites: bool
+            Whether the created movies may replace existing ones, whose title is then read
+            before the write. False when every create has a new id.
+        """
+        super().__init__(repository)
+        self._cache = cache
+        self._overwrites = overwrites
+
+    async def _title(self, movie_id: str) -> typing.Optional[str]:
+        # The title a movie had before a write, its queries are outdated by the write.
+        movie = await self._repository.get_by_id(movie_id, fields=("title",))
+        return None if movie is None else movie.title
+
+    async def create(self, movie: Movie):
+        previous = await self._title(movie.id) if self._overwrites else None
+        try:
+            await self._repository.create(movie)
+        finally:
+            self._cache.bump(
+                [movie.title] if previous is None else [movie.title, previous]
+            )
+
+    async def create_many(
+        self, movies: typing.List[Movie]
+    ) -> typing.List[typing.Optional[str]]:
+        previous = []
+        if self._overwrites:
+            previous = await self._repository.get_many([movie.id for movie in movies])
+        try:
+            return await self._repository.create_many(movies)
+        finally:
+            titles = [movie.title for movie in movies]
+            titles.extend(movie.title for movie in previous if movie is not None)
+            self._cache.bump(titles)
+
+    async def update(self, movie_id: str, update_parameters: dict) -> Movie:
+        if "title" not in update_parameters:
+            # The title is unchanged, the updated movie holds it.
+            movie = await self._repository.update(movie_id, update_parameters)
+            self._cache.bump([movie.title])
+            return movie
+        previous = await self._title(movie_id)
+        try:
+            return await self._repository.update(movie_id, update_parameters)
+        finally:
+            titles = [] if previous is None else [previous]
+            if isinstance(update_parameters["title"], str):
+                titles.append(update_parameters["title"])
+            self._cache.bump(titles)
+
+    async def delete(self, movie_id: str) -> typing.Optional[Movie]:
+        movie = await self._repository.delete(movie_id)
+        if movie is not None:
+            self._cache.bump([movie.title])
+        return movie
@@ -0,0 +1,223 @@
+"""
+    Trigram similarity of movie titles, for the fuzzy title search.
+"""
+import collections
+import heapq
+import itertools
+import math
+import re
+import typing
+from array import array
+
+from api.repository.movie.abstractions import fold_title
+
+_WORD = re.compile(r"\w+")
+
+
+def padded_title(title: str) -> str:
+    """
+    Returns the folded words of the title, each one padded with two spaces before and one
+    after, like PostgreSQL pg_trgm does.
+
+    Every trigram of the title is a substring of the padded title, and since a trigram
+    never ends with two spaces nor holds one between two letters, the opposite is true too.
+    """
+    return "".join(f"  {word} " for word in _WORD.findall(fold_title(title)))
+
+
+def title_trigrams(title: str) -> typing.Set[str]:
+    """
+    Returns the trigrams of the padded words of the title.
+    """
+    trigrams = set()
+    for word in _WORD.findall(fold_title(title)):
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def similarity(overlap: int, query_size: int, title_size: int) -> float:
+    """
+    Returns the Jaccard similarity of two trigram sets, from their sizes and the size of
+    their intersection.
+    """
+    return overlap / (query_size + title_size - overlap)
+
+
+def required_overlap(query_size: int, threshold: float) -> int:
+    """
+    Returns the number of trigrams a title must share with the query to be at least
+    threshold similar to it.
+
+    The union of the two sets holds at least the query, so the overlap of a similar title is
+    at least threshold * query_size.
+    """
+    return max(1, math.ceil(threshold * query_size - 1e-9))
+
+
+class TrigramIndex:
+    """
+    TrigramIndex is an inverted index from the trigrams of the movie titles to the movies.
+
+    Every movie is given a slot, the postings hold slots in compact arrays. Removing a movie
+    leaves a tombstone behind, the postings are rebuilt once the tombstones outnumber the
+    movies.
+    """
+
+    def __init__(self, max_postings: int = 20_000, max_candidates: int = 1_000):
+        """
+        Parameters
+        ----------
+        max_postings: int
+            The maximum number of postings read by a search, past the postings of the rarest
+            trigram of the query.
+        max_candidates: int
+            The maximum number of titles scored by a search, the ones sharing the most
+            trigrams with the query in the postings read.
+        """
+        self._max_postings = max_postings
+        self._max_candidates = max_candidates
+        self._postings: typing.Dict[str, array] = {}
+        self._slots: typing.Dict[str, int] = {}
+        # By slot, None for the tombstones.
+        self._ids: typing.List[typing.Optional[str]] = []
+        self._padded: typing.List[typing.Optional[str]] = []
+        self._sizes = array("H")
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, movie_id: str, title: str):
+        """
+        Indexes the title of a movie, replacing its previous title.
+        """
+        slot = self._slots.get(movie_id)
+        padded = padded_title(title)
+        if slot is not None:
+            if self._padded[slot] == padded:
+                return
+            self.remove(movie_id)
+        trigrams = title_trigrams(title)
+        slot = len(self._ids)
+        self._slots[movie_id] = slot
+        self._ids.append(movie_id)
+        self._padded.append(padded)
+        self._sizes.append(min(len(trigrams), 0xFFFF))
+        for trigram in trigrams:
+            postings = self._postings.get(trigram)
+            if postings is None:
+                postings = self._postings[trigram] = array("I")
+            postings.append(slot)
+
+    def remove(self, movie_id: str):
+        """
+        Removes a movie from the index, if it is indexed.
+        """
+        slot = self._slots.pop(movie_id, None)
+        if slot is None:
+            return
+        self._ids[slot] = None
+        self._padded[slot] = None
+        tombstones = len(self._ids) - len(self._slots)
+        if tombstones > 1024 and tombstones > len(self._slots):
+            self._compact()
+
+    def _compact(self):
+        movies = [
+            (movie_id, padded)
+            for movie_id, padded in zip(self._ids, self._padded)
+            if movie_id is not None
+        ]
+        self._postings = {}
+        self._slots = {}
+        self._ids = []
+        self._padded = []
+        self._sizes = array("H")
+        for movie_id, padded in movies:
+            # The padded title holds the folded words, indexing it gives the same trigrams.
+            self.add(movie_id, padded)
+
+    def search(
+        self, title: str, limit: int = 10, threshold: float = 0.3
+    ) -> typing.List[typing.Tuple[str, float]]:
+        """
+        Returns the ids and similarities of the limit titles most similar to title and at
+        least threshold similar, most similar first.
+        """
+        query = title_trigrams(title)
+        if not query:
+            return []
+        query_size = len(query)
+        # A title sharing the required overlap with the query holds at least one of any
+        # query_size - required + 1 of its trigrams, so reading the postings of that many
+        # trigrams finds every similar title. The rarest ones are read first, and reading
+        # stops early past max_postings, trading recall for a bounded latency. The other
+        # trigrams are looked up in the candidate titles.
+        required = required_overlap(query_size, threshold)
+        ordered = sorted(
+            query, key=lambda trigram: len(self._postings.get(trigram, ()))
+        )
+        scanned = 0
+        read = 0
+        for trigram in ordered[: query_size - required + 1]:
+            postings = len(self._postings.get(trigram, ()))
+            if read and read + postings > self._max_postings:
+                break
+            scanned += 1
+            read += postings
+        looked_up = ordered[scanned:]
+        hits = collections.Counter(
+            itertools.chain.from_iterable(
+                self._postings.get(trigram, ()) for trigram in ordered[:scanned]
+            )
+        )
+        candidates: typing.Iterable[typing.Tuple[int, int]] = hits.items()
+        if len(hits) > self._max_candidates:
+            # Keeps the titles with the most hits, found from the histogram of the hits
+            # rather than by sorting them. The ties at the boundary are kept in slot order.
+            histogram = collections.Counter(hits.values())
+            above = 0
+            for boundary in sorted(histogram, reverse=True):
+                if above + histogram[boundary] > self._max_candidates:
+                    break
+                above += histogram[boundary]
+            candidates = [
+                (slot, count) for slot, count in hits.items() if count > boundary
+            ]
+            candidates.extend(
+                itertools.islice(
+                    (
+                        (slot, count)
+                        for slot, count in hits.items()
+                        if count == boundary
+                    ),
+                    self._max_candidates - above,
+                )
+            )
+
+        # The size of a similar title is between threshold * query_size and
+        # query_size / threshold.
+        min_size = threshold * query_size
+        max_size = query_size / threshold if threshold > 0 else math.inf
+        ids = self._ids
+        padded = self._padded
+        sizes = self._sizes
+        results = []
+        for slot, overlap in candidates:
+            movie_id = ids[slot]
+            if movie_id is None:
+                continue
+            size = sizes[slot]
+            if size < min_size or size > max_size:
+                continue
+            if overlap + len(looked_up) < required:
+                continue
+            if looked_up:
+                text = padded[slot]
+                overlap += sum(1 for trigram in looked_up if trigram in text)
+            score = overlap / (query_size + size - overlap)
+            if score >= threshold:
+                results.append((movie_id, score))
+        return heapq.nsmallest(
+            limit, results, key=lambda result: (-result[1], result[0])
+        )
@@ -0,0 +1,181 @@
+"""
+    Responses encoding Movie entities straight to JSON bytes.
+"""
+import hashlib
+import typing
+import zlib
+
+import orjson
+from starlette.responses import Response
+
+from api.entities.movie import Movie
+
+
+def movie_to_dict(
+    movie: Movie, fields: typing.Optional[typing.Sequence[str]] = None
+) -> dict:
+    """
+    Converts a Movie to the dict representation of MovieResponse, trimmed to id and fields if set.
+    """
+    if fields is not None:
+        movie_dict = {"id": movie.id}
+        movie_dict.update({field: getattr(movie, field) for field in fields})
+        return movie_dict
+    return {
+        "id": movie.id,
+        "title": movie.title,
+        "description": movie.description,
+        "release_year": movie.release_year,
+        "watched": movie.watched,
+    }
+
+
+def _digest(values: list) -> str:
+    return hashlib.blake2b(orjson.dumps(values), digest_size=8).hexdigest()
+
+
+def movie_etag(
+    movie: Movie, fields: typing.Optional[typing.Sequence[str]] = None
+) -> str:
+    """
+    Returns the strong ETag of the representation of a movie, trimmed to id and fields if set.
+
+    The tag is a hash of the fields returned. The whole movie is also tagged with its
+    version, which tells apart two writes of the same content. The version alone isn't
+    enough: it starts over when a deleted movie is created again with the same id.
+    """
+    if fields is None:
+        values = [getattr(movie, field) for field in Movie.FIELDS]
+        return f'"{movie.version}-{_digest(values)}"'
+    return f'"{_digest([getattr(movie, field) for field in fields])}"'
+
+
+def page_etag(
+    movies: typing.List[Movie], fields: typing.Optional[typing.Sequence[str]] = None
+) -> str:
+    """
+    Returns the weak ETag of a page of movies, from the ids and the fields returned of its
+    movies, and their versions when they are whole.
+    """
+    if fields is None:
+        values = [
+            [movie.id, movie.version]
+            + [getattr(movie, field) for field in Movie.FIELDS]
+            for movie in movies
+        ]
+    else:
+        values = [
+            [movie.id] + [getattr(movie, field) for field in fields] for movie in movies
+        ]
+    return f'W/"{_digest(values)}"'
+
+
+def etag_matches(if_none_match: typing.Optional[str], etag: str) -> bool:
+    """
+    Tells if an If-None-Match header holds the ETag, compared weakly as GET requests do.
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class MovieJSONResponse(Response):
+    """
+    MovieJSONResponse renders a Movie, or a list of Movies, as the JSON of MovieResponse.
+
+    The movies are encoded with orjson in a single pass, without building MovieResponse models,
+    validating them against the route response model and running jsonable_encoder.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: typing.Union[Movie, typing.List[Movie]],
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        status_code: int = 200,
+        headers: typing.Optional[typing.Mapping[str, str]] = None,
+    ):
+        # Set before calling the parent constructor which renders the content.
+        self._fields = fields
+        super().__init__(content=content, status_code=status_code, headers=headers)
+
+    def render(self, content: typing.Union[Movie, typing.List[Movie]]) -> bytes:
+        if isinstance(content, Movie):
+            return orjson.dumps(movie_to_dict(content, self._fields))
+        return orjson.dumps([movie_to_dict(movie, self._fields) for movie in content])
+
+
+async def ndjson_lines(
+    movies: typing.AsyncIterator[Movie],
+    fields: typing.Optional[typing.Sequence[str]] = None,
+) -> typing.AsyncIterator[bytes]:
+    """
+    Encodes every movie into a line of newline delimited JSON as soon as it is read.
+    """
+    async for movie in movies:
+        yield orjson.dumps(movie_to_dict(movie, fields)) + b"\n"
+
+
+async def joined_chunks(
+    chunks: typing.AsyncIterator[bytes], size: int = 64 * 1024
+) -> typing.AsyncIterator[bytes]:
+    """
+    Joins small chunks into chunks of at least size bytes, but the last one, so a long
+    stream isn't sent one small chunk at a time.
+    """
+    buffer = []
+    buffered = 0
+    async for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield b"".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def accepts_gzip(accept_encoding: typing.Optional[str]) -> bool:
+    """
+    Tells if an Accept-Encoding header allows gzip.
+    """
+    if accept_encoding is None:
+        return False
+    for coding in accept_encoding.split(","):
+        name, _, parameters = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = parameters.strip().replace(" ", "")
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+async def gzip_chunks(
+    chunks: typing.AsyncIterator[bytes], level: int = 6
+) -> typing.AsyncIterator[bytes]:
+    """
+    Compresses a stream of chunks into a gzip stream on the fly.
+    """
+    # wbits 31 writes the gzip header and trailer.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
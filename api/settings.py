@@ -1,3 +1,4 @@
+import typing
 from functools import lru_cache
 
 from pydantic import BaseSettings, Field
@@ -24,6 +25,133 @@ class Settings(BaseSettings):
         description="The database name for the MongoDB Movies database.",
         env="MONGODB_DATABASE_NAME",
     )
+    mongo_cursor_batch_size: int = Field(
+        200,
+        title="MongoDB cursor batch size",
+        description="The number of documents fetched per round trip when reading a cursor.",
+        env="MONGODB_CURSOR_BATCH_SIZE",
+    )
+    mongo_export_batch_size: int = Field(
+        5000,
+        title="MongoDB export batch size",
+        description="The number of documents fetched per round trip when exporting every movie.",
+        env="MONGODB_EXPORT_BATCH_SIZE",
+    )
+    mongo_max_pool_size: typing.Optional[int] = Field(
+        None,
+        title="MongoDB max pool size",
+        description="The maximum number of connections to MongoDB per API process, the one of the connection string or the driver default if not set.",
+        env="MONGODB_MAX_POOL_SIZE",
+    )
+    mongo_min_pool_size: typing.Optional[int] = Field(
+        None,
+        title="MongoDB min pool size",
+        description="The number of connections to MongoDB opened on startup and kept open, the one of the connection string or the driver default if not set.",
+        env="MONGODB_MIN_POOL_SIZE",
+    )
+    mongo_max_idle_time_ms: typing.Optional[int] = Field(
+        None,
+        title="MongoDB max idle time",
+        description="The milliseconds a connection can stay idle before being closed, the one of the connection string or no limit if not set.",
+        env="MONGODB_MAX_IDLE_TIME_MS",
+    )
+    mongo_wait_queue_timeout_ms: typing.Optional[int] = Field(
+        None,
+        title="MongoDB wait queue timeout",
+        description="The milliseconds a request waits for a free connection, the one of the connection string or no limit if not set.",
+        env="MONGODB_WAIT_QUEUE_TIMEOUT_MS",
+    )
+    mongo_compressors: str = Field(
+        "",
+        title="MongoDB compressors",
+        description="Comma separated wire protocol compressors, for example zstd,snappy,zlib. Default: none",
+        env="MONGODB_COMPRESSORS",
+    )
+    mongo_manage_indexes: bool = Field(
+        True,
+        title="MongoDB manage indexes",
+        description="Report and create the movie collection indexes on startup if set to True. Default: True",
+        env="MONGODB_MANAGE_INDEXES",
+    )
+    # Movie Cache Settings
+    movie_cache_enabled: bool = Field(
+        False,
+        title="Enable movie cache",
+        description="Serve movies by id from an in process cache if set to True. Default: False",
+        env="MOVIE_CACHE_ENABLED",
+    )
+    movie_cache_max_size: int = Field(
+        10_000,
+        title="Movie cache max size",
+        description="The maximum number of movies held by the movie cache.",
+        env="MOVIE_CACHE_MAX_SIZE",
+    )
+    movie_cache_ttl: float = Field(
+        30.0,
+        title="Movie cache TTL",
+        description="The number of seconds a movie is served from the movie cache.",
+        env="MOVIE_CACHE_TTL",
+    )
+
+    # Title Result Cache Settings
+    title_result_cache_enabled: bool = Field(
+        False,
+        title="Enable title result cache",
+        description="Serve repeated title queries from an in process cache of their responses if set to True. Every update of a title then reads the movie first, to invalidate its previous title. Default: False",
+        env="TITLE_RESULT_CACHE_ENABLED",
+    )
+    title_result_cache_max_bytes: int = Field(
+        64 * 1024 * 1024,
+        title="Title result cache max bytes",
+        description="The maximum size of the responses held by the title result cache. Default: 64 MiB",
+        env="TITLE_RESULT_CACHE_MAX_BYTES",
+    )
+    title_result_cache_ttl: float = Field(
+        5.0,
+        title="Title result cache TTL",
+        description="The number of seconds a response is served from the title result cache. Default: 5",
+        env="TITLE_RESULT_CACHE_TTL",
+    )
+
+    # Movie Batching Settings
+    movie_batching_enabled: bool = Field(
+        False,
+        title="Enable movie batching",
+        description="Read the movies requested by id concurrently with a single query if set to True. Default: False",
+        env="MOVIE_BATCHING_ENABLED",
+    )
+    movie_batch_window: float = Field(
+        0.0,
+        title="Movie batch window",
+        description="The number of seconds a batch waits for more ids, 0 for one event loop iteration. Default: 0",
+        env="MOVIE_BATCH_WINDOW",
+    )
+    movie_batch_max_size: int = Field(
+        100,
+        title="Movie batch max size",
+        description="The maximum number of ids read by a single batch. Default: 100",
+        env="MOVIE_BATCH_MAX_SIZE",
+    )
+
+    # Movie Create Coalescing Settings
+    movie_create_coalescing_enabled: bool = Field(
+        False,
+        title="Enable movie create coalescing",
+        description="Write the movies created concurrently with a single bulk write if set to True. Default: False",
+        env="MOVIE_CREATE_COALESCING_ENABLED",
+    )
+    movie_create_coalesce_window: float = Field(
+        0.005,
+        title="Movie create coalesce window",
+        description="The number of seconds a batch waits for more creates, 0 for one event loop iteration. Default: 0.005",
+        env="MOVIE_CREATE_COALESCE_WINDOW",
+    )
+    movie_create_coalesce_max_size: int = Field(
+        500,
+        title="Movie create coalesce max size",
+        description="The maximum number of movies written by a single batch. Default: 500",
+        env="MOVIE_CREATE_COALESCE_MAX_SIZE",
+    )
 
     def __hash__(self) -> int:
         return 1
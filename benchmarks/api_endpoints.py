@@ -0,0 +1,242 @@
+"""
+    Benchmarks every movie route in process, through an ASGI transport and against
+    MemoryMovieRepository, so only the API's own per request overhead is measured.
+
+    Every scenario is run for each catalog size, the title listings also for each page size.
+    Throughput and latency percentiles are printed and saved as JSON; pass the JSON of a
+    previous run with --compare to see the change of every scenario.
+
+    Usage: python -m benchmarks.api_endpoints [--sizes 1000 100000] [--pages 10 1000]
+                                              [--requests 200] [--output results.json]
+                                              [--compare previous.json]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+import typing
+
+import httpx
+
+from api.api import create_app
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import (
+    TITLE_EXACT,
+    TITLE_INSENSITIVE,
+    TITLE_PREFIX,
+)
+from api.repository.movie.memory import MemoryMovieRepository
+from api.settings import settings_instance
+
+# The number of movies sharing a title in the seeded catalogs.
+MOVIES_PER_TITLE = 1000
+# The number of movies streamed by the export scenario.
+EXPORTED_MOVIES = 1000
+
+Scenario = typing.Callable[[httpx.AsyncClient, int], typing.Awaitable[httpx.Response]]
+
+
+async def seed(size: int) -> MemoryMovieRepository:
+    repo = MemoryMovieRepository()
+    titles = max(size // MOVIES_PER_TITLE, 1)
+    await repo.create_many(
+        [
+            Movie(
+                movie_id=f"{i:08d}",
+                title=f"movie title {i % titles}",
+                description="A description of the movie which is longer than the rest.",
+                release_year=1950 + i % 70,
+            )
+            for i in range(size)
+        ]
+    )
+    return repo
+
+
+def scenarios(size: int, pages: typing.List[int]) -> typing.Dict[str, Scenario]:
+    """
+    Returns the scenarios to run against a catalog of the given size, by name.
+
+    The i argument of a scenario is the index of the request, used to spread the requests
+    over the catalog.
+    """
+    movie = {
+        "title": "My Movie",
+        "description": "My description",
+        "release_year": 2000,
+    }
+    titles = max(size // MOVIES_PER_TITLE, 1)
+    exported = min(size, EXPORTED_MOVIES)
+    export_params = {}
+    if exported < size:
+        export_params["after"] = f"{size - exported - 1:08d}"
+    result: typing.Dict[str, Scenario] = {
+        "POST /": lambda client, i: client.post("/api/v1/movies/", json=movie),
+        "POST /bulk (100)": lambda client, i: client.post(
+            "/api/v1/movies/bulk", json=[movie] * 100
+        ),
+        "GET /{movie_id}": lambda client, i: client.get(
+            f"/api/v1/movies/{i % size:08d}"
+        ),
+        "GET /{movie_id} (fields)": lambda client, i: client.get(
+            f"/api/v1/movies/{i % size:08d}?fields=title"
+        ),
+        "GET /batch (100)": lambda client, i: client.get(
+            "/api/v1/movies/batch",
+            params={"ids": [f"{(i + j) % size:08d}" for j in range(100)]},
+        ),
+        "PATCH /{movie_id}": lambda client, i: client.patch(
+            f"/api/v1/movies/{i % size:08d}", json={"watched": i % 2 == 0}
+        ),
+        # Every scenario runs against a freshly seeded catalog, deletes don't leak.
+        "DELETE /{movie_id}": lambda client, i: client.delete(
+            f"/api/v1/movies/{i % size:08d}"
+        ),
+        "GET /fuzzy": lambda client, i: client.get(
+            "/api/v1/movies/fuzzy", params={"title": f"movei title {i % titles}"}
+        ),
+        "GET /search": lambda client, i: client.get(
+            "/api/v1/movies/search", params={"q": "longer description"}
+        ),
+        # The last movies of the catalog, so a request costs the same for every size.
+        f"GET /export ({exported})": lambda client, i: client.get(
+            "/api/v1/movies/export", params=export_params
+        ),
+    }
+    for page in pages:
+        for name, headers in (
+            ("json", {}),
+            ("ndjson", {"Accept": "application/x-ndjson"}),
+        ):
+            result[f"GET / limit={page} ({name})"] = title_listing(
+                titles, page, headers
+            )
+        for match in (TITLE_INSENSITIVE, TITLE_PREFIX):
+            result[f"GET / limit={page} match={match}"] = title_listing(
+                titles, page, {}, match
+            )
+    return result
+
+
+def title_listing(
+    titles: int, page: int, headers: dict, match: str = TITLE_EXACT
+) -> Scenario:
+    """
+    Returns a scenario getting pages of the given size, spread over the titles.
+    """
+
+    def get(client: httpx.AsyncClient, i: int):
+        title = f"movie title {i % titles}"
+        if match == TITLE_INSENSITIVE:
+            title = title.upper()
+        return client.get(
+            "/api/v1/movies/",
+            params={"title": title, "limit": page, "match": match},
+            headers=headers,
+        )
+
+    return get
+
+
+async def run_scenario(
+    repo: MemoryMovieRepository, scenario: Scenario, requests: int
+) -> dict:
+    app = create_app()
+    app.state.movie_repository = repo
+    latencies = []
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        # Warm up.
+        await scenario(client, 0)
+        start = time.perf_counter()
+        for i in range(requests):
+            request_start = time.perf_counter()
+            response = await scenario(client, i)
+            latencies.append(time.perf_counter() - request_start)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{response.status_code}: {response.text}")
+        elapsed = time.perf_counter() - start
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "throughput": requests / elapsed,
+        "p50_ms": percentiles[49] * 1e3,
+        "p95_ms": percentiles[94] * 1e3,
+        "p99_ms": percentiles[98] * 1e3,
+    }
+
+
+def git_commit() -> typing.Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    # Keep the prometheus instrumentation out of the measurements.
+    settings_instance().enable_metrics = False
+    results = []
+    print(
+        f"{'size':>8} {'scenario':<36} {'req/s':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for size in args.sizes:
+        for name, scenario in scenarios(size, args.pages).items():
+            repo = await seed(size)
+            result = {"size": size, "scenario": name}
+            result.update(await run_scenario(repo, scenario, args.requests))
+            results.append(result)
+            print(
+                f"{size:>8} {name:<36} {result['throughput']:>9.0f} "
+                f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f}"
+            )
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(args.compare, results)
+
+
+def compare(path: str, results: typing.List[dict]):
+    with open(path) as f:
+        previous = json.load(f)
+    previous_results = {
+        (result["size"], result["scenario"]): result for result in previous["results"]
+    }
+    print(f"\ncompared to {previous.get('commit') or path}")
+    print(f"{'size':>8} {'scenario':<36} {'req/s':>9} {'p99':>9}")
+    for result in results:
+        before = previous_results.get((result["size"], result["scenario"]))
+        if before is None:
+            continue
+        throughput = result["throughput"] / before["throughput"] - 1
+        p99 = result["p99_ms"] / before["p99_ms"] - 1
+        print(
+            f"{result['size']:>8} {result['scenario']:<36} "
+            f"{throughput:>+9.1%} {p99:>+9.1%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare")
+    asyncio.run(main(parser.parse_args()))
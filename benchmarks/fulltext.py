@@ -0,0 +1,97 @@
+"""
+    Measures the size and the query latency of the description index of
+    MemoryMovieRepository on a synthetic catalog.
+
+    The descriptions are sentences of 30 to 90 words drawn from a Zipf distributed
+    vocabulary, sprinkled with stop words, like natural text. Queries are one to three
+    words drawn from the same distribution.
+
+    Usage: python -m benchmarks.fulltext [--size 100000] [--vocabulary 50000] [--queries 200]
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import time
+
+from api.entities.movie import Movie
+from api.repository.movie.fulltext import STOP_WORDS
+from api.repository.movie.memory import MemoryMovieRepository
+
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+
+
+def vocabulary(size: int, rng: random.Random):
+    words = set()
+    while len(words) < size:
+        words.add(
+            "".join(
+                rng.choice(CONSONANTS) + rng.choice(VOWELS)
+                for _ in range(rng.randint(2, 4))
+            )
+        )
+    words = sorted(words)
+    rng.shuffle(words)
+    # Zipf: the weight of the word of rank r is 1 / r.
+    cumulative = list(itertools.accumulate(1 / rank for rank in range(1, size + 1)))
+    return words, cumulative
+
+
+async def main(size: int, vocabulary_size: int, queries: int):
+    rng = random.Random(42)
+    words, cumulative = vocabulary(vocabulary_size, rng)
+    stop_words = sorted(STOP_WORDS)
+
+    def sentence(length: int) -> str:
+        return " ".join(
+            rng.choice(stop_words) if rng.random() < 0.4 else word
+            for word in rng.choices(words, cum_weights=cumulative, k=length)
+        )
+
+    descriptions = [sentence(rng.randint(30, 90)) for _ in range(size)]
+    raw_bytes = sum(len(description.encode()) for description in descriptions)
+    repo = MemoryMovieRepository()
+    start = time.perf_counter()
+    await repo.create_many(
+        [
+            Movie(
+                movie_id=str(i),
+                title="title",
+                description=description,
+                release_year=2000,
+            )
+            for i, description in enumerate(descriptions)
+        ]
+    )
+    print(f"indexed {size} descriptions in {time.perf_counter() - start:.1f}s")
+    # noinspection PyProtectedMember
+    index_bytes = repo._description_index.nbytes()
+    print(
+        f"raw text {raw_bytes / 1e6:.1f}MB, index {index_bytes / 1e6:.1f}MB "
+        f"({index_bytes / raw_bytes:.0%} of the text)"
+    )
+
+    latencies = []
+    for _ in range(queries):
+        query = " ".join(
+            rng.choices(words, cum_weights=cumulative, k=rng.randint(1, 3))
+        )
+        start = time.perf_counter()
+        await repo.search_by_description(query, limit=10)
+        latencies.append(time.perf_counter() - start)
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{queries} queries: p50 {percentiles[49] * 1e3:.2f}ms "
+        f"p95 {percentiles[94] * 1e3:.2f}ms p99 {percentiles[98] * 1e3:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.size, args.vocabulary, args.queries))
@@ -0,0 +1,115 @@
+"""
+    Measures the fuzzy title search of MemoryMovieRepository on a synthetic catalog.
+
+    The titles are made of one to four words, drawn from pronounceable random words and a
+    few common ones like "the" or "night". Every query is the title of a random movie with
+    one character dropped, swapped or replaced. The report has the latency percentiles and
+    how often the misspelled movie, or one with the same title, is in the results.
+
+    Usage: python -m benchmarks.fuzzy_title [--size 1000000] [--queries 500] [--limit 10]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import string
+import time
+import typing
+
+from api.entities.movie import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+
+COMMON_WORDS = (
+    "the",
+    "of",
+    "a",
+    "and",
+    "in",
+    "return",
+    "night",
+    "man",
+    "love",
+    "story",
+)
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+
+
+def synthetic_titles(size: int, rng: random.Random) -> typing.List[str]:
+    def word() -> str:
+        return "".join(
+            rng.choice(CONSONANTS)
+            + rng.choice(VOWELS)
+            + (rng.choice(CONSONANTS) if rng.random() < 0.4 else "")
+            for _ in range(rng.randint(1, 3))
+        )
+
+    words = [word() for _ in range(max(size // 20, 100))]
+    return [
+        " ".join(
+            rng.choice(words) if rng.random() < 0.7 else rng.choice(COMMON_WORDS)
+            for _ in range(rng.randint(1, 4))
+        ).title()
+        for _ in range(size)
+    ]
+
+
+def misspell(title: str, rng: random.Random) -> str:
+    i = rng.randrange(len(title))
+    typo = rng.randrange(3)
+    if typo == 0:
+        return title[:i] + title[i + 1 :]
+    if typo == 1 and i + 1 < len(title):
+        return title[:i] + title[i + 1] + title[i] + title[i + 2 :]
+    return title[:i] + rng.choice(string.ascii_lowercase) + title[i + 1 :]
+
+
+async def main(size: int, queries: int, limit: int):
+    rng = random.Random(42)
+    titles = synthetic_titles(size, rng)
+    repo = MemoryMovieRepository()
+    start = time.perf_counter()
+    await repo.create_many(
+        [
+            Movie(
+                movie_id=str(i),
+                title=title,
+                description="description",
+                release_year=2000,
+            )
+            for i, title in enumerate(titles)
+        ]
+    )
+    print(f"indexed {size} titles in {time.perf_counter() - start:.1f}s")
+
+    # Queries shorter than the 3 characters accepted by the route are not drawn.
+    picks = [
+        i
+        for i in (rng.randrange(size) for _ in range(queries * 2))
+        if len(titles[i]) >= 4
+    ][:queries]
+    latencies = []
+    found = 0
+    for i in picks:
+        query = misspell(titles[i], rng)
+        start = time.perf_counter()
+        results = await repo.get_by_fuzzy_title(query, limit=limit)
+        latencies.append(time.perf_counter() - start)
+        found += any(
+            result.movie.title.lower() == titles[i].lower() for result in results
+        )
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{len(picks)} queries: p50 {percentiles[49] * 1e3:.2f}ms "
+        f"p95 {percentiles[94] * 1e3:.2f}ms p99 {percentiles[98] * 1e3:.2f}ms, "
+        f"misspelled title found {found / len(picks):.0%}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.size, args.queries, args.limit))
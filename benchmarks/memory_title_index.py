@@ -0,0 +1,70 @@
+"""
+    Measures MemoryMovieRepository.get_by_title latency for growing catalog sizes.
+
+    Every title holds the same number of movies, so with the title index the lookup
+    latency should stay flat while the catalog grows from 10k to 1M movies. The case
+    insensitive and prefix matches bisect the folded title index, their latency should
+    grow with the logarithm of the catalog size only.
+
+    Usage: python -m benchmarks.memory_title_index [--sizes 10000 100000 1000000]
+"""
+import argparse
+import asyncio
+import time
+
+from api.entities.movie import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+
+MOVIES_PER_TITLE = 50
+
+
+async def build_repository(size: int) -> MemoryMovieRepository:
+    repo = MemoryMovieRepository()
+    await repo.create_many(
+        [
+            Movie(
+                movie_id=str(i),
+                title=f"Title {i % (size // MOVIES_PER_TITLE)}",
+                description="description",
+                release_year=2000,
+            )
+            for i in range(size)
+        ]
+    )
+    return repo
+
+
+async def measure(
+    repo: MemoryMovieRepository, size: int, iterations: int, match: str, prefix: str
+) -> float:
+    titles = size // MOVIES_PER_TITLE
+    start = time.perf_counter()
+    for i in range(iterations):
+        await repo.get_by_title(f"{prefix} {i % titles}", skip=0, limit=10, match=match)
+    return (time.perf_counter() - start) / iterations
+
+
+async def main(sizes, iterations: int):
+    matches = (
+        ("exact", "Title"),
+        ("insensitive", "title"),
+        ("prefix", "TITLE"),
+    )
+    print(f"{'movies':>10}" + "".join(f" {f'{m} (us)':>18}" for m, _ in matches))
+    for size in sizes:
+        repo = await build_repository(size)
+        latencies = [
+            await measure(repo, size, iterations, match, prefix)
+            for match, prefix in matches
+        ]
+        print(f"{size:>10}" + "".join(f" {l * 1e6:>18.2f}" for l in latencies))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--iterations", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.iterations))
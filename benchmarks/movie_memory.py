@@ -0,0 +1,110 @@
+"""
+    Reports the bytes per movie held by MemoryMovieRepository, measured with tracemalloc.
+
+    "before" stores movies with a per instance __dict__, like Movie did before it used
+    __slots__, "after" stores the current Movie. The strings are interned up front so only
+    the entities and the repository structures are measured.
+
+    Usage: python -m benchmarks.movie_memory [--movies 100000]
+"""
+import argparse
+import asyncio
+import gc
+import tracemalloc
+
+from api.entities.movie import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+class DictMovie:
+    """
+    DictMovie is Movie as it was before using __slots__, attributes live in a per instance dict.
+    """
+
+    def __init__(
+        self,
+        *,
+        movie_id: str,
+        title: str,
+        description: str,
+        release_year: int,
+        watched: bool = False,
+        version: int = 0,
+    ):
+        self._id = movie_id
+        self._title = title
+        self._description = description
+        self._release_year = release_year
+        self._watched = watched
+        self._version = version
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @property
+    def release_year(self) -> int:
+        return self._release_year
+
+    @property
+    def watched(self) -> bool:
+        return self._watched
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def with_version(self, version: int) -> "DictMovie":
+        return DictMovie(
+            movie_id=self._id,
+            title=self._title,
+            description=self._description,
+            release_year=self._release_year,
+            watched=self._watched,
+            version=version,
+        )
+
+
+async def bytes_per_movie(movie_class, values) -> float:
+    gc.collect()
+    tracemalloc.start()
+    repo = MemoryMovieRepository()
+    for movie_id, title, description in values:
+        await repo.create(
+            movie_class(
+                movie_id=movie_id,
+                title=title,
+                description=description,
+                release_year=2000,
+            )
+        )
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / len(values)
+
+
+async def main(movies: int):
+    values = [
+        (f"{i:032x}", f"movie title {i % 1000}", f"movie description {i % 1000}")
+        for i in range(movies)
+    ]
+    before = await bytes_per_movie(DictMovie, values)
+    after = await bytes_per_movie(Movie, values)
+    print(f"{'entity':>10} {'bytes/movie':>12}")
+    print(f"{'before':>10} {before:>12.1f}")
+    print(f"{'after':>10} {after:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.movies))
@@ -0,0 +1,230 @@
+"""
+    Replays a recorded request log against a running instance or the in process app.
+
+    The log is a JSON lines file with one request per line:
+
+        {"timestamp": 1666000000.12, "method": "GET", "path": "/api/v1/movies/?title=Alien",
+         "headers": {"Accept": "application/x-ndjson"}, "body": null}
+
+    Only method and path are required. Lines which are not requests are skipped.
+
+    Arrivals are open loop: every request is sent at its scheduled time whether or not the
+    previous ones have completed, and its latency is measured from that time so a slow
+    server can't hide its queueing. The schedule is one of:
+
+    - --rate R: R requests per second, evenly spaced.
+    - the recorded timestamps, divided by --time-scale (2 replays twice as fast).
+    - as fast as possible, if the log has no timestamps.
+
+    --concurrency caps the requests in flight. The report has a latency histogram,
+    percentiles and error rates for every route.
+
+    Usage: python -m benchmarks.replay requests.jsonl [--target http://localhost:8080]
+                                       [--concurrency 64] [--rate 500] [--time-scale 1]
+"""
+import argparse
+import asyncio
+import bisect
+import collections
+import json
+import statistics
+import time
+import typing
+
+import httpx
+from starlette.routing import Match
+
+from api.api import create_app
+from api.repository.movie.memory import MemoryMovieRepository
+from api.settings import settings_instance
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class RecordedRequest(typing.NamedTuple):
+    timestamp: typing.Optional[float]
+    method: str
+    path: str
+    headers: typing.Dict[str, str]
+    body: typing.Any
+
+
+class RouteStats:
+    """
+    RouteStats accumulates the outcome of the requests sent to a route.
+    """
+
+    def __init__(self):
+        self.latencies: typing.List[float] = []
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.client_errors = 0
+        self.server_errors = 0
+        self.failures = 0
+
+    def record(self, latency: float, status_code: typing.Optional[int]):
+        self.latencies.append(latency)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, latency * 1e3)] += 1
+        if status_code is None:
+            self.failures += 1
+        elif status_code >= 500:
+            self.server_errors += 1
+        elif status_code >= 400:
+            self.client_errors += 1
+
+
+def read_log(path: str) -> typing.Tuple[typing.List[RecordedRequest], int]:
+    """
+    Returns the requests of the log and the number of lines skipped.
+    """
+    requests = []
+    skipped = 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                requests.append(
+                    RecordedRequest(
+                        timestamp=record.get("timestamp"),
+                        method=record["method"].upper(),
+                        path=record["path"],
+                        headers=record.get("headers") or {},
+                        body=record.get("body"),
+                    )
+                )
+            except (ValueError, KeyError, AttributeError, TypeError):
+                skipped += 1
+    return requests, skipped
+
+
+def schedule(
+    requests: typing.List[RecordedRequest],
+    rate: typing.Optional[float],
+    time_scale: float,
+) -> typing.List[float]:
+    """
+    Returns the send time of every request, in seconds from the start of the replay.
+    """
+    if rate:
+        return [i / rate for i in range(len(requests))]
+    if requests and all(request.timestamp is not None for request in requests):
+        first = min(request.timestamp for request in requests)
+        return [(request.timestamp - first) / time_scale for request in requests]
+    return [0.0] * len(requests)
+
+
+def route_template(app, method: str, path: str) -> str:
+    """
+    Returns the route matching the request, like GET /api/v1/movies/{movie_id}.
+    """
+    scope = {"type": "http", "method": method, "path": path.split("?")[0]}
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return f"{method} {route.path}"
+    return f"{method} (unmatched)"
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    requests: typing.List[RecordedRequest],
+    send_times: typing.List[float],
+    routes: typing.List[str],
+    concurrency: int,
+) -> typing.Dict[str, RouteStats]:
+    stats: typing.Dict[str, RouteStats] = collections.defaultdict(RouteStats)
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+
+    async def send(request: RecordedRequest, send_time: float, route: str):
+        async with semaphore:
+            status_code = None
+            try:
+                response = await client.request(
+                    request.method,
+                    request.path,
+                    headers=request.headers,
+                    json=request.body,
+                )
+                await response.aread()
+                status_code = response.status_code
+            except httpx.HTTPError:
+                pass
+        # Measured from the scheduled time, so waiting for a free slot counts too.
+        stats[route].record(time.perf_counter() - start - send_time, status_code)
+
+    tasks = []
+    for request, send_time, route in zip(requests, send_times, routes):
+        delay = send_time - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(request, send_time, route)))
+    await asyncio.gather(*tasks)
+    return stats
+
+
+def report(stats: typing.Dict[str, RouteStats], elapsed: float):
+    total = sum(len(route_stats.latencies) for route_stats in stats.values())
+    print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.0f} req/s)")
+    for route, route_stats in sorted(stats.items()):
+        count = len(route_stats.latencies)
+        print(f"\n{route}: {count} requests")
+        if count > 1:
+            percentiles = statistics.quantiles(route_stats.latencies, n=100)
+            print(
+                f"  p50 {percentiles[49] * 1e3:.2f}ms  p95 {percentiles[94] * 1e3:.2f}ms"
+                f"  p99 {percentiles[98] * 1e3:.2f}ms"
+            )
+        print(
+            f"  4xx {route_stats.client_errors / count:.2%}"
+            f"  5xx {route_stats.server_errors / count:.2%}"
+            f"  failed {route_stats.failures / count:.2%}"
+        )
+        bounds = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        for bound, bucket in zip(bounds, route_stats.buckets):
+            if bucket:
+                bar = "#" * max(1, round(40 * bucket / count))
+                print(f"  {bound:>9} {bucket:>7} {bar}")
+
+
+async def main(args):
+    requests, skipped = read_log(args.log)
+    if skipped:
+        print(f"skipped {skipped} lines which are not requests")
+    if not requests:
+        return
+    send_times = schedule(requests, args.rate, args.time_scale)
+    settings_instance().enable_metrics = False
+    app = create_app()
+    routes = [route_template(app, request.method, request.path) for request in requests]
+    if args.target:
+        client = httpx.AsyncClient(
+            base_url=args.target,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency),
+        )
+    else:
+        app.state.movie_repository = MemoryMovieRepository()
+        client = httpx.AsyncClient(app=app, base_url="http://replay")
+    async with client:
+        start = time.perf_counter()
+        stats = await replay(client, requests, send_times, routes, args.concurrency)
+        elapsed = time.perf_counter() - start
+    report(stats, elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("log", help="The recorded request log, in JSON lines.")
+    parser.add_argument(
+        "--target", help="The base url of a running instance, in process if not set."
+    )
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rate", type=float, help="Requests per second.")
+    parser.add_argument("--time-scale", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,54 @@
+"""
+    Measures the per call overhead of InstrumentedMovieRepository over the
+    MemoryMovieRepository it wraps, so the difference is the cost of the metrics alone.
+
+    Usage: python -m benchmarks.repository_instrumentation [--iterations 100000]
+"""
+import argparse
+import asyncio
+import time
+
+from api.entities.movie import Movie
+from api.repository.movie.instrumented import InstrumentedMovieRepository
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+async def measure(call, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await call()
+    return (time.perf_counter() - start) / iterations
+
+
+async def main(iterations: int):
+    repo = MemoryMovieRepository()
+    await repo.create(
+        Movie(
+            movie_id="my-id",
+            title="My Movie",
+            description="My description",
+            release_year=1990,
+        )
+    )
+    instrumented = InstrumentedMovieRepository(repo, backend="memory")
+    print(
+        f"{'operation':>14} {'raw (us)':>10} {'instrumented (us)':>18} {'overhead':>9}"
+    )
+    for name, call in (
+        ("get_by_id", lambda r: r.get_by_id("my-id")),
+        ("get_by_title", lambda r: r.get_by_title("My Movie")),
+        ("get_many", lambda r: r.get_many(["my-id", "missing"])),
+    ):
+        raw = await measure(lambda: call(repo), iterations)
+        wrapped = await measure(lambda: call(instrumented), iterations)
+        print(
+            f"{name:>14} {raw * 1e6:>10.2f} {wrapped * 1e6:>18.2f} "
+            f"{(wrapped - raw) * 1e6:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))